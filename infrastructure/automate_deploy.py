@@ -105,6 +105,12 @@ def setup_firewall(host_config, cluster_ips, is_manager=False):
     # Мы используем --force или echo y
     run_ssh(host_config, "sudo ufw --force enable")
 
+    # Порт реплики Redis (6380, опубликован в режиме host) Docker открывает своими правилами iptables
+    # в обход ufw. Разрешаем его только контейнерам этой ноды (трафик через docker_gwbridge).
+    # Правило в DOCKER-USER не переживает перезагрузку: setup_firewall повторяется при каждом деплое
+    replica_rule = "DOCKER-USER -p tcp -m conntrack --ctorigdstport 6380 ! -i docker_gwbridge -j DROP"
+    run_ssh(host_config, f"sudo iptables -C {replica_rule} 2>/dev/null || sudo iptables -I {replica_rule}", ignore_errors=True)
+
 def setup_registry(manager_config, config):
     print(f" Настройка Docker Registry как Swarm Service на {manager_config['ip']}...")
     
@@ -192,6 +198,7 @@ def setup_secrets(manager_config, config):
         "db_user": config["db_user"],
         "db_name": config["db_name"],
         "app_secret": config["app_secret"],
+        "redis_password": config["redis_password"],
         "secret_key": config["app_secret"], # Для совместимости
         "registry_password": config["registry_password"],
         "pgadmin_password": config["pgadmin_password"],
@@ -391,7 +398,8 @@ def main():
         f"export DB_PASSWORD='{config.get('db_password', 'postgres')}' && "
         f"export DB_NAME='{config.get('db_name', 'postgres')}' && "
         f"export PGADMIN_DEFAULT_EMAIL='{config.get('pgadmin_email', 'admin@admin.com')}' && "
-        f"export PGADMIN_DEFAULT_PASSWORD='{config.get('pgadmin_password', 'admin_password_123')}'"
+        f"export PGADMIN_DEFAULT_PASSWORD='{config.get('pgadmin_password', 'admin_password_123')}' && "
+        f"export REDIS_PASSWORD='{config['redis_password']}'"
     )
     
     deploy_infra_cmd = f"cd {infra_dir} && {env_vars} && docker stack deploy -c infrastructure.yml {stack_name}"
@@ -1,16 +1,17 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from typing import Optional
 
 from app.core.logger import logger
+from app.core import security
 from app.core.config import settings
-from app.core.redis import redis_client
-from app.db.session import get_db
-from app.models.user import User
+from app.core.deadline import DeadlineExceeded
+from app.core.redis import RedisBatch, client_cache, fail_open_allowed, get_redis_batch
+from app.core.singleflight import SingleFlight
+from app.db import queries
+from app.db.queries import UserRow
+from app.db.session import AsyncSessionLocal
 from app.schemas.token import TokenPayload
 
 class OAuth2PasswordBearerWithCookie(OAuth2PasswordBearer):
@@ -42,13 +43,29 @@ reusable_oauth2 = OAuth2PasswordBearerWithCookie(
     tokenUrl="/api/auth/login"
 )
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:
+# Параллельные запросы с одним токеном выполняют одну проверку denylist и один запрос пользователя
+denylist_checks = SingleFlight("denylist_check")
+user_lookups = SingleFlight("user_lookup")
+
+async def _is_revoked(jti: str, batch: RedisBatch) -> bool:
+    # Читаем с мастера, как и метки версий: инвалидации клиентского кэша приходят с мастера,
+    # и отстающая реплика сразу после инвалидации ответила бы «не отозван» — этот ответ
+    # остался бы в кэше на REDIS_CLIENT_CACHE_TTL
+    key = f"denylist:{jti}"
+    return bool(await client_cache.get_or_load(key, lambda: batch.exists(key)))
+
+async def _load_user(user_id: int) -> Optional[UserRow]:
+    # Собственная сессия: общий вызов не должен зависеть от сессии запроса, который его начал.
+    # Второго соединения из пула одновременно с сессией запроса она не держит: AsyncSession
+    # берёт соединение при первом запросе, а зависимости выполняются до тела эндпоинта,
+    # так что эта сессия закрывается раньше, чем get_db обратится к БД
+    async with AsyncSessionLocal() as db:
+        return await queries.get_user_with_role_by_id(db, user_id)
+
+async def get_token_payload(token: str = Depends(reusable_oauth2)) -> TokenPayload:
+    """Токен с проверенной подписью и сроком; denylist не проверяется (см. check_not_revoked)."""
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_token(token)
         token_data = TokenPayload(**payload)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -63,25 +80,6 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    # Check denylist in Redis
-    if token_data.jti:
-        try:
-            is_revoked = await redis_client.exists(f"denylist:{token_data.jti}")
-            if is_revoked:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has been revoked",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-        except HTTPException:
-            raise
-        except Exception:
-            # Redis is down
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Service temporarily unavailable, please try later"
-            )
 
     if token_data.sub is None:
         raise HTTPException(
@@ -89,28 +87,65 @@ async def get_current_user(
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    result = await db.execute(
-        select(User)
-        .where(User.id == token_data.sub)
-        .options(selectinload(User.role_obj))
-    )
-    user = result.scalar_one_or_none()
+    return token_data
+
+async def check_not_revoked(token_data: TokenPayload, redis_batch: RedisBatch) -> None:
+    """Проверка denylist в Redis. Команда идёт через redis_batch: вызванная вместе с другими
+    чтениями запроса (asyncio.gather), она уходит в Redis с ними одним pipeline."""
+    if not token_data.jti:
+        return
+    try:
+        is_revoked = await denylist_checks.do(
+            token_data.jti, lambda: _is_revoked(token_data.jti, redis_batch)
+        )
+        if is_revoked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    except (HTTPException, DeadlineExceeded):
+        raise
+    except Exception:
+        # Redis is down: по политике можно пропустить проверку, но не дольше времени жизни access-токена
+        if not fail_open_allowed(
+            "denylist_check",
+            settings.REDIS_DENYLIST_CHECK_POLICY,
+            max_degraded_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            breaker=redis_batch.breaker,
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Service temporarily unavailable, please try later"
+            )
+
+async def get_token_data(
+    token_data: TokenPayload = Depends(get_token_payload),
+    redis_batch: RedisBatch = Depends(get_redis_batch),
+) -> TokenPayload:
+    """Проверенный токен (подпись, срок, denylist) без обращения к БД."""
+    await check_not_revoked(token_data, redis_batch)
+    return token_data
+
+async def get_current_user(
+    token_data: TokenPayload = Depends(get_token_data),
+) -> UserRow:
+    user = await user_lookups.do(token_data.sub, lambda: _load_user(token_data.sub))
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserRow = Depends(get_current_user),
+) -> UserRow:
     if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
     return current_user
 
 async def get_current_active_admin(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+    current_user: UserRow = Depends(get_current_active_user),
+) -> UserRow:
     if not current_user.role_obj or current_user.role_obj.name != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have enough privileges"
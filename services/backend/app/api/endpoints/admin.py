@@ -1,14 +1,20 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, List, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
-from sqlalchemy.orm import selectinload
 
 from app.api import deps
+from app.core.config import settings
+from app.core.redis import redis_client, redis_read_client
+from app.core.result_cache import ResultCache
+from app.core.serialization import dump_json
+from app.core.shm_cache import shared_cache
+from app.core.versions import USERS, etag_headers, make_etag, not_modified, versions
+from app.db.queries import UserRow
 from app.db.session import get_db
 from app.models.user import User
 from app.models.role import Role
-from app.schemas.user import User as UserSchema
+from app.schemas.user import User as UserSchema, UserList
 
 router = APIRouter(
     tags=["admin"],
@@ -17,26 +23,76 @@ router = APIRouter(
 
 # Описание тега: Панель администратора: управление пользователями и системные настройки.
 
+users_page_cache = ResultCache(
+    "admin_users", redis_client, redis_read_client, ttl=settings.ADMIN_USERS_CACHE_TTL, local=shared_cache
+)
+
+SORT_FIELDS = ("id", "username", "email", "role_id", "is_active")
+
+def parse_sort(sort: str) -> Tuple[str, str]:
+    """Разбор sort вида field:order -> (поле из SORT_FIELDS, "asc"|"desc"); неизвестное поле — username."""
+    if not sort or ":" not in sort:
+        return "username", "asc"
+    try:
+        field, order = sort.split(":")
+    except ValueError:
+        return "username", "asc"
+    if field not in SORT_FIELDS:
+        field = "username"
+    return field, "desc" if order == "desc" else "asc"
+
 @router.get(
     "/users",
-    response_model=Any,
+    response_model=UserList,
     summary="Список пользователей",
     description="Возвращает список всех пользователей системы с поддержкой фильтрации по имени, роли, а также с пагинацией и сортировкой. Доступно только администраторам.",
     response_description="Список пользователей и общее количество записей."
 )
 async def read_users(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
     role: str = Query(None),
     sort: str = Query("name:asc"),
-    current_user: User = Depends(deps.get_current_active_admin),
+    current_user: UserRow = Depends(deps.get_current_active_admin),
 ) -> Any:
     """
     Retrieve users for admin dashboard.
     """
-    query = select(User)
+    # Параметры приводятся к виду, в котором они влияют на результат: разные
+    # написания одного запроса дают один ETag и один ключ кэша
+    search = (search.strip().lower() or None) if search else None
+    role = (role.strip() or None) if role else None
+    sort_field, sort_order = parse_sort(sort)
+    params = ("admin_users", page, limit, search, role, sort_field, sort_order)
+
+    # Права администратора проверены зависимостью до условной обработки (RFC 9110, 13.2.1):
+    # ETag и кэш страницы зависят только от метки списка и общие для всех администраторов
+    scopes = [USERS]
+    stamps = await versions.try_get(*scopes)
+    etag = make_etag(scopes, stamps, *params) if stamps is not None else None
+    response = not_modified("admin_users", request, etag)
+    if response is not None:
+        return response
+
+    cache_key = users_page_cache.key(stamps[0], *params) if stamps is not None else None
+    if cache_key is not None:
+        body = await users_page_cache.get(cache_key)
+        if body is not None:
+            return Response(body, media_type="application/json", headers=etag_headers(etag))
+
+    # Только нужные столбцы (роль — тем же запросом): строки сериализуются сразу в JSON,
+    # без ORM-объектов и отдельного запроса selectinload
+    query = select(
+        User.id,
+        User.username,
+        User.email,
+        func.coalesce(Role.name, "No Role").label("role_name"),
+        User.role_id,
+        User.is_active,
+    ).outerjoin(User.role_obj)
     
     # Filtering
     if search:
@@ -48,32 +104,21 @@ async def read_users(
         query = query.where(or_(*filters))
     
     if role:
-        query = query.join(User.role_obj).where(Role.name == role)
+        query = query.where(Role.name == role)
     
-    # Count total users after filtering but before pagination and options
-    total_query = select(func.count(User.id)).select_from(query.subquery())
+    # Count total users after filtering but before pagination
+    total_query = select(func.count()).select_from(query.subquery())
     total_result = await db.execute(total_query)
     total = total_result.scalar() or 0
     
-    # Add relations and sorting
-    query = query.options(selectinload(User.role_obj))
-    
-    if sort and ":" in sort:
-        try:
-            field, order = sort.split(":")
-            attr = getattr(User, field, User.username)
-            if order == "desc":
-                query = query.order_by(attr.desc())
-            else:
-                query = query.order_by(attr.asc())
-        except Exception:
-            query = query.order_by(User.username.asc())
-    else:
-        query = query.order_by(User.username.asc())
+    attr = getattr(User, sort_field)
+    query = query.order_by(attr.desc() if sort_order == "desc" else attr.asc())
     
     # Pagination
     query = query.offset((page - 1) * limit).limit(limit)
     result = await db.execute(query)
-    users = result.scalars().all()
     
-    return {"users": [u.serialization() for u in users], "total": total}
+    body = dump_json(UserList, {"users": result.all(), "total": total}, from_attributes=True)
+    if cache_key is not None:
+        await users_page_cache.set(cache_key, body)
+    return Response(body, media_type="application/json", headers=etag_headers(etag))
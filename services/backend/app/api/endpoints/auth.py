@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
@@ -9,8 +11,16 @@ from jose import jwt, JWTError
 
 from app.api import deps
 from app.core import security
+from app.core import deadline
 from app.core.config import settings
-from app.core.redis import redis_client
+from app.core.deadline import DeadlineExceeded
+from app.core.login_shield import login_shield
+from app.core.ratelimit import client_ip, rate_limit
+from app.core.serialization import json_response
+from app.core.versions import USERS, etag_headers, not_modified, user_scope, versions
+from app.core.redis import RedisBatch, fail_open_allowed, get_redis_batch, redis_client
+from app.db import queries
+from app.db.queries import UserRow
 from app.db.session import get_db
 from app.models.user import User
 from app.models.role import Role
@@ -37,42 +47,49 @@ async def update_user_me(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(deps.get_current_active_user),
+    current_user: UserRow = Depends(deps.get_current_active_user),
 ) -> Any:
-    if user_in.email is not None and user_in.email != current_user.email:
+    # current_user — лёгкая строка из быстрого пути, для изменения нужна ORM-модель
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if user_in.email is not None and user_in.email != user.email:
         result = await db.execute(select(User).where(User.email == user_in.email))
-        user = result.scalar_one_or_none()
-        if user:
+        existing = result.scalar_one_or_none()
+        if existing:
             raise HTTPException(
                 status_code=400,
                 detail="The user with this email already exists in the system.",
             )
-        current_user.email = user_in.email
+        user.email = user_in.email
     
     if user_in.username is not None:
-        current_user.username = user_in.username
+        user.username = user_in.username
     
     if user_in.password is not None:
-        current_user.hashed_password = security.get_password_hash(user_in.password)
+        user.hashed_password = security.get_password_hash(user_in.password)
     
-    db.add(current_user)
+    db.add(user)
     await db.commit()
-    await db.refresh(current_user)
+    await versions.bump(user_scope(user.id), USERS)
+    await db.refresh(user)
     
     # Reload with role_obj
     result = await db.execute(
         select(User)
-        .where(User.id == current_user.id)
+        .where(User.id == user.id)
         .options(selectinload(User.role_obj))
     )
-    return result.scalar_one()
+    return json_response(UserSchema, result.scalar_one(), from_attributes=True)
 
 @router.post(
     "/register",
     response_model=UserSchema,
     summary="Регистрация",
     description="Создание новой учётной записи пользователя. По умолчанию назначается роль 'user'.",
-    response_description="Данные созданного пользователя."
+    response_description="Данные созданного пользователя.",
+    dependencies=[Depends(rate_limit("register"))]
 )
 async def register(
     *,
@@ -106,6 +123,7 @@ async def register(
         )
         db.add(user)
         await db.commit()
+        await versions.bump(USERS)
         
         # Eagerly load role_obj for serialization
         result = await db.execute(
@@ -119,7 +137,7 @@ async def register(
         access_token = security.create_access_token(user.id)
         refresh_token = security.create_refresh_token(user.id)
         
-        response = JSONResponse(UserSchema.model_validate(user).model_dump())
+        response = json_response(UserSchema, user, from_attributes=True)
         
         response.set_cookie(
             key="access_token",
@@ -153,8 +171,6 @@ async def register(
             detail=f"Internal Server Error during registration: {str(e)}"
         )
 
-from fastapi_limiter.depends import RateLimiter
-
 @router.post(
     "/login",
     tags=["auth"],
@@ -165,7 +181,7 @@ from fastapi_limiter.depends import RateLimiter
         "При ошибке возвращается 401 с пояснением: неверный пароль, пользователь не найден и т.д."
     ),
     response_description="Успешная аутентификация. Токен действителен 24 часа.",
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))]
+    dependencies=[Depends(rate_limit("login"))]
 )
 async def login(
     request: Request,
@@ -174,20 +190,29 @@ async def login(
 ) -> Any:
     from app.core.logger import logger
     
-    ip = request.client.host if request.client else "unknown"
+    ip = client_ip(request)
     ua = request.headers.get("user-agent", "unknown")
     
-    result = await db.execute(select(User).where(User.email == form_data.username))
-    user = result.scalar_one_or_none()
+    # Заблокированные аккаунт/подсеть отклоняются до поиска пользователя и хеширования
+    await login_shield.check(form_data.username, ip)
+    # Бюджет хеширования расходуется до поиска пользователя, одинаково для существующих
+    # и несуществующих аккаунтов: иначе 503 выдавал бы, что аккаунт есть.
+    # Не начинаем ~50 мс хеширования, если ответ клиенту уже не нужен
+    deadline.check("password_hash")
+    login_shield.spend_hash()
+    
+    user = await queries.get_user_by_email(db, form_data.username)
     
     if not user or not security.verify_password(form_data.password, user.hashed_password):
         logger.warning(f"Failed login attempt for email: {form_data.username} from IP: {ip}, UA: {ua}")
+        await login_shield.record_failure(form_data.username, ip)
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         logger.warning(f"Login attempt for inactive user: {form_data.username} from IP: {ip}, UA: {ua}")
         raise HTTPException(status_code=400, detail="Inactive user")
     
     logger.info(f"Successful login for user: {user.email} from IP: {ip}, UA: {ua}")
+    await login_shield.record_success(form_data.username, ip)
     
     access_token = security.create_access_token(user.id)
     refresh_token = security.create_refresh_token(user.id)
@@ -225,7 +250,8 @@ async def login(
     response_model=Token,
     summary="Обновить токен доступа",
     description="Использует refresh_token из кук для получения нового access_token. Старый refresh_token аннулируется и заносится в denylist.",
-    response_description="Новый токен доступа."
+    response_description="Новый токен доступа.",
+    dependencies=[Depends(rate_limit("refresh"))]
 )
 async def refresh(
     request: Request,
@@ -263,37 +289,44 @@ async def refresh(
         raise HTTPException(status_code=401, detail="Refresh token missing")
     
     try:
-        payload = jwt.decode(
-            refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
+        payload = security.decode_token(refresh_token)
         token_data = TokenPayload(**payload)
         if payload.get("type") != "refresh" or not token_data.jti or not token_data.sub or not token_data.exp:
             raise HTTPException(status_code=401, detail="Invalid token type or missing JTI/sub/exp")
         
-        # Check denylist in Redis
+        # Check denylist and revoke old jti in one Redis round trip:
+        # SET NX не выполнится, если токен уже в denylist (заодно исключает повторное использование
+        # одного refresh-токена параллельными запросами)
+        from datetime import datetime, timezone
         try:
-            is_revoked = await redis_client.exists(f"denylist:{token_data.jti}")
-            if is_revoked:
-                response = JSONResponse(status_code=401, content={"detail": "Token has been revoked"})
-                response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
-                return response
+            ttl = max(int(token_data.exp - datetime.now(timezone.utc).timestamp()), 1)
+            is_revoked = not await redis_client.set(
+                f"denylist:{token_data.jti}", token_data.sub, ex=ttl, nx=True
+            )
+        except DeadlineExceeded:
+            raise
         except Exception:
             # Redis is down
-            raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+            if not fail_open_allowed("refresh", settings.REDIS_REFRESH_POLICY):
+                raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
+            is_revoked = False
+        if is_revoked:
+            response = JSONResponse(status_code=401, content={"detail": "Token has been revoked"})
+            response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
+            return response
 
     except jwt.ExpiredSignatureError:
         response = JSONResponse(status_code=401, content={"detail": "Refresh token expired"})
         response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
         return response
-    except HTTPException:
+    except (HTTPException, DeadlineExceeded):
         raise
     except (JWTError, Exception):
         response = JSONResponse(status_code=401, content={"detail": "Could not validate credentials"})
         response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
         return response
     
-    result = await db.execute(select(User).where(User.id == token_data.sub))
-    user = result.scalar_one_or_none()
+    user = await queries.get_user_by_id(db, token_data.sub)
     if not user:
         response = JSONResponse(status_code=404, content={"detail": "User not found"})
         response.delete_cookie("refresh_token", path="/api/auth", samesite="strict")
@@ -306,16 +339,6 @@ async def refresh(
     new_access_token = security.create_access_token(user.id)
     new_refresh_token = security.create_refresh_token(user.id)
     
-    # Revoke old jti in Redis
-    from datetime import datetime, timezone
-    try:
-        ttl = int(token_data.exp - datetime.now(timezone.utc).timestamp())
-        if ttl > 0:
-            await redis_client.set(f"denylist:{token_data.jti}", user.id, ex=ttl)
-    except Exception:
-        # Redis is down
-        raise HTTPException(status_code=503, detail="Service temporarily unavailable, please try later")
-    
     response = JSONResponse({
         "token_type": "bearer",
     })
@@ -355,9 +378,7 @@ async def logout(
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
         try:
-            payload = jwt.decode(
-                refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-            )
+            payload = security.decode_token(refresh_token)
             token_data = TokenPayload(**payload)
             if payload.get("type") == "refresh" and token_data.jti and token_data.sub and token_data.exp:
                 from datetime import datetime, timezone
@@ -388,6 +409,21 @@ async def logout(
     response_description="Данные текущего пользователя."
 )
 async def read_user_me(
-    current_user: User = Depends(deps.get_current_active_user),
+    request: Request,
+    token_data: TokenPayload = Depends(deps.get_token_payload),
+    redis_batch: RedisBatch = Depends(get_redis_batch),
 ) -> Any:
-    return current_user
+    # Проверка denylist и метка версии уходят в Redis одним pipeline
+    _, etag = await asyncio.gather(
+        deps.check_not_revoked(token_data, redis_batch),
+        versions.etag([user_scope(token_data.sub)], "me", client=redis_batch),
+    )
+    # Условие If-None-Match проверяется только после проверки доступа (RFC 9110, 13.2.1):
+    # удалённый или отключённый пользователь не получит 304 даже с If-None-Match: *
+    current_user = await deps.get_current_active_user(await deps.get_current_user(token_data))
+    response = not_modified("auth_me", request, etag)
+    if response is not None:
+        return response
+
+    # Только поля публичной схемы UserSchema: новые столбцы UserRow в ответ не попадут
+    return json_response(UserSchema, current_user, from_attributes=True, headers=etag_headers(etag))
@@ -0,0 +1,135 @@
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.api import deps
+from app.core.allocations import SnapshotNotFound, TracingNotActive, allocation_tracker
+from app.core.profiling import ProfilerBusy, collapsed, cpu_profiler, node_name, speedscope, worker_labels
+
+router = APIRouter(
+    tags=["debug"],
+    dependencies=[Depends(deps.get_current_active_admin)],
+)
+
+# Описание тега: Диагностика воркера в работе (профилирование CPU и выделений памяти). Доступно только администраторам.
+
+@router.get(
+    "/profile/cpu",
+    summary="Профиль CPU воркера",
+    description=(
+        "Снимает стек цикла событий воркера, принявшего запрос, с частотой rate по процессорному времени "
+        "в течение seconds секунд (простой цикла выборок не даёт) "
+        "и возвращает свёрнутые стеки (format=collapsed, для flamegraph.pl и speedscope) или JSON speedscope. "
+        "Воркер и нода — в заголовках X-Worker-Id и X-Node-Name; чтобы попасть в другой воркер, повторите запрос. "
+        "Одновременно в воркере выполняется только одно профилирование."
+    ),
+    response_description="Свёрнутые стеки или профиль speedscope.",
+)
+async def profile_cpu(
+    seconds: float = Query(10.0, gt=0, le=60),
+    rate: int = Query(100, ge=1, le=1000),
+    format: Literal["collapsed", "speedscope"] = Query("collapsed"),
+):
+    try:
+        samples, total = await cpu_profiler.profile(seconds, rate)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="Profiling is already running in this worker")
+
+    headers = worker_labels({"X-Profile-Samples": str(total)})
+    if format == "speedscope":
+        name = f"{node_name()} worker {headers['X-Worker-Id']} ({seconds:g}s @ {rate} Hz)"
+        return JSONResponse(speedscope(samples, name, rate), headers=headers)
+    return PlainTextResponse(collapsed(samples), headers=headers)
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+def _snapshot_not_found(e: SnapshotNotFound) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Snapshot {e.args[0] or 'latest'} not found in this worker")
+
+@router.get(
+    "/memory",
+    summary="Состояние трассировки памяти",
+    description="Включена ли трассировка выделений памяти в воркере, сколько памяти она отслеживает и какие снимки хранятся.",
+)
+async def memory_status():
+    return JSONResponse(allocation_tracker.status(), headers=worker_labels())
+
+@router.post(
+    "/memory/start",
+    summary="Запустить трассировку памяти",
+    description=(
+        "Включает tracemalloc в воркере, принявшем запрос. frames — глубина стека у каждого выделения "
+        "(1 — группировка по строке, больше — по цепочке вызовов, дороже). При interval > 0 снимки "
+        "делаются по расписанию. Через duration секунд (не больше ALLOC_TRACE_MAX_DURATION) трассировка "
+        "выключается сама. Повторный запуск сбрасывает снимки."
+    ),
+)
+async def memory_start(
+    frames: int = Query(1, ge=1, le=50),
+    interval: float = Query(0, ge=0, le=3600),
+    duration: Optional[float] = Query(None, gt=0),
+):
+    allocation_tracker.start(frames, interval, duration)
+    return JSONResponse(allocation_tracker.status(), headers=worker_labels())
+
+@router.post(
+    "/memory/stop",
+    summary="Остановить трассировку памяти",
+    description="Выключает tracemalloc и освобождает трассы и снимки.",
+)
+async def memory_stop():
+    await allocation_tracker.stop()
+    return JSONResponse(allocation_tracker.status(), headers=worker_labels())
+
+@router.post(
+    "/memory/snapshots",
+    summary="Снимок памяти",
+    description="Делает снимок выделений памяти воркера. Трассировка должна быть запущена в этом же воркере.",
+)
+async def memory_snapshot():
+    try:
+        info = await asyncio.to_thread(allocation_tracker.snapshot)
+    except TracingNotActive:
+        raise HTTPException(status_code=409, detail="Allocation tracing is not running in this worker")
+    return JSONResponse(info, headers=worker_labels())
+
+@router.get(
+    "/memory/top",
+    summary="Крупнейшие места выделения памяти",
+    description="Места выделения памяти с наибольшим занятым объёмом в снимке snapshot (по умолчанию — последнем).",
+)
+async def memory_top(
+    snapshot: Optional[int] = Query(None),
+    group_by: GroupBy = Query("lineno"),
+    limit: int = Query(30, ge=1, le=500),
+):
+    try:
+        stats = await asyncio.to_thread(allocation_tracker.top, snapshot, group_by, limit)
+    except SnapshotNotFound as e:
+        raise _snapshot_not_found(e)
+    return JSONResponse({"snapshot": snapshot, "group_by": group_by, "stats": stats}, headers=worker_labels())
+
+@router.get(
+    "/memory/diff",
+    summary="Разница снимков памяти",
+    description=(
+        "Сравнивает снимок snapshot (по умолчанию — последний) с base: сначала места с наибольшим "
+        "ростом занятой памяти. Растущие между одинаковыми нагрузками строки указывают на объекты, "
+        "которые переживают запросы."
+    ),
+)
+async def memory_diff(
+    base: int = Query(...),
+    snapshot: Optional[int] = Query(None),
+    group_by: GroupBy = Query("lineno"),
+    limit: int = Query(30, ge=1, le=500),
+):
+    try:
+        stats = await asyncio.to_thread(allocation_tracker.diff, base, snapshot, group_by, limit)
+    except SnapshotNotFound as e:
+        raise _snapshot_not_found(e)
+    return JSONResponse(
+        {"base": base, "snapshot": snapshot, "group_by": group_by, "stats": stats}, headers=worker_labels()
+    )
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.logger import logger
 from app.core.config import settings
+from app.core.health import health_monitor
+from app.core import memory
+from app.core.metrics import registry
 from app.db.session import get_db
+import hmac
 import os
-import psycopg2
 
 router = APIRouter(
     tags=["root"],
@@ -26,16 +30,30 @@ async def read_root():
 @router.get(
     "/health",
     summary="Проверка состояния",
-    description="Простой эндпоинт для проверки того, что приложение запущено и отвечает на запросы. Используется Liveness и Readiness пробами.",
+    description="Liveness: процесс запущен и цикл событий отвечает. Зависимости не проверяются — для этого есть /ready.",
     response_description="Статус 'ok'."
 )
 async def health():
     return {"status": "ok"}
 
+@router.get(
+    "/ready",
+    summary="Готовность",
+    description=(
+        "Readiness: последний результат фоновой проверки БД, Redis и ограничителя запросов "
+        "(возраст и задержка каждой проверки). Зависимости при вызове не опрашиваются. "
+        "503, если критичная зависимость недоступна или результат устарел."
+    ),
+    response_description="Агрегированный статус и результаты проверок.",
+)
+async def ready():
+    snapshot = health_monitor.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
 @router.get(
     "/db-check",
     summary="Проверка БД",
-    description="Проверяет соединение с базой данных PostgreSQL и возвращает версию сервера.",
+    description="Проверяет соединение с базой данных PostgreSQL и возвращает версию сервера. Выполняет запрос при каждом вызове — для проб используйте /ready.",
     response_description="Статус подключения и версия БД."
 )
 async def db_check(db: AsyncSession = Depends(get_db)):
@@ -66,7 +84,7 @@ async def get_node_name():
 @router.get(
     "/redis-check",
     summary="Проверка Redis",
-    description="Проверяет доступность Redis, выполняя команду PING.",
+    description="Проверяет доступность Redis, выполняя команду PING при каждом вызове — для проб используйте /ready.",
     response_description="Результат PING или сообщение об ошибке."
 )
 async def redis_check():
@@ -78,3 +96,22 @@ async def redis_check():
     except Exception as e:
         logger.error(f"Redis connection error: {e}")
         return {"status": "error", "message": str(e)}
+
+@router.get(
+    "/metrics",
+    summary="Метрики",
+    description=(
+        "Внутренние метрики воркера в текстовом формате Prometheus (счётчики singleflight и т.д.). "
+        "Каждый сэмпл помечен pid воркера. Доступно только из внутренней сети (Traefik путь не публикует); "
+        "если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer <token>."
+    ),
+    response_description="Метрики в формате Prometheus text exposition.",
+    response_class=PlainTextResponse,
+)
+async def metrics(request: Request):
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    memory.update_metrics()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,166 @@
+"""Трассировка выделений памяти воркера (tracemalloc) и сравнение снимков.
+
+Пока трассировка выключена, накладных расходов нет: tracemalloc
+запускается только командой администратора и останавливается по команде
+или сам через ALLOC_TRACE_MAX_DURATION секунд. Во время трассировки каждое
+выделение памяти дороже (порядка десятков процентов CPU при frames=1), а
+сами трассы занимают память, поэтому хранится не больше
+ALLOC_TRACE_MAX_SNAPSHOTS снимков.
+
+Снимки делаются по запросу или по расписанию (interval). Для поиска
+утечек сравнивают два снимка, сделанных между одинаковыми нагрузками:
+строки с растущим size_diff — места, где выделены объекты, которые
+переживают запросы (карты идентичности сессий ORM, записи логов,
+неограниченные кэши).
+"""
+import asyncio
+import itertools
+import time
+import tracemalloc
+from collections import deque
+from typing import Deque, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.profiling import short_path
+
+# Служебные выделения, которые не относятся к приложению
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+class TracingNotActive(Exception):
+    pass
+
+class SnapshotNotFound(Exception):
+    pass
+
+class _Snapshot:
+    def __init__(self, snapshot_id: int, snapshot: tracemalloc.Snapshot):
+        self.id = snapshot_id
+        self.taken_at = time.time()
+        self.snapshot = snapshot
+        stats = snapshot.statistics("filename")
+        self.size = sum(stat.size for stat in stats)
+        self.count = sum(stat.count for stat in stats)
+
+    def info(self) -> dict:
+        return {"id": self.id, "taken_at": self.taken_at, "size": self.size, "count": self.count}
+
+def _stat(stat, group_by: str) -> dict:
+    frames = [{"file": short_path(frame.filename), "line": frame.lineno} for frame in stat.traceback]
+    item = {**frames[0], "size": stat.size, "count": stat.count}
+    if group_by == "filename":
+        del item["line"]
+    if group_by == "traceback":
+        # tracemalloc хранит кадры от самого вложенного; выводим от корня, как в профиле CPU
+        item["traceback"] = frames[::-1]
+    if hasattr(stat, "size_diff"):
+        item["size_diff"] = stat.size_diff
+        item["count_diff"] = stat.count_diff
+    return item
+
+class AllocationTracker:
+    def __init__(self, max_snapshots: int = 10, max_duration: float = 3600.0):
+        self.max_duration = max_duration
+        self.frames = 1
+        self.started_at: Optional[float] = None
+        self._snapshots: Deque[_Snapshot] = deque(maxlen=max_snapshots)
+        self._ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1, interval: float = 0, duration: Optional[float] = None) -> None:
+        """Запускает трассировку; при interval > 0 снимки делаются по расписанию."""
+        if self._task is not None:
+            self._task.cancel()
+        if self.active:
+            self._stop_tracing()
+        self.frames = frames
+        self.started_at = time.time()
+        tracemalloc.start(frames)
+        duration = min(duration or self.max_duration, self.max_duration)
+        self._task = asyncio.create_task(self._run(interval, duration))
+        logger.info(f"Allocation tracing started: frames={frames}, interval={interval}s, duration={duration}s")
+
+    async def stop(self) -> None:
+        """Останавливает трассировку и освобождает трассы и снимки."""
+        task, self._task = self._task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.active:
+            self._stop_tracing()
+            logger.info("Allocation tracing stopped")
+
+    def _stop_tracing(self) -> None:
+        tracemalloc.stop()
+        self._snapshots.clear()
+        self.started_at = None
+
+    async def _run(self, interval: float, duration: float) -> None:
+        deadline = time.monotonic() + duration
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(interval, remaining) if interval > 0 else remaining)
+            if interval > 0 and time.monotonic() < deadline:
+                # Снимок и подсчёт статистики — сотни миллисекунд CPU; в потоке цикл не стоит всё это время
+                await asyncio.to_thread(self.snapshot)
+        await self.stop()
+
+    def snapshot(self) -> dict:
+        if not self.active:
+            raise TracingNotActive()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        taken = _Snapshot(next(self._ids), snapshot)
+        self._snapshots.append(taken)
+        return taken.info()
+
+    def _get(self, snapshot_id: Optional[int]) -> _Snapshot:
+        if not self._snapshots:
+            raise SnapshotNotFound(snapshot_id)
+        if snapshot_id is None:
+            return self._snapshots[-1]
+        for taken in self._snapshots:
+            if taken.id == snapshot_id:
+                return taken
+        raise SnapshotNotFound(snapshot_id)
+
+    def top(self, snapshot_id: Optional[int] = None, group_by: str = "lineno", limit: int = 30) -> List[dict]:
+        """Крупнейшие места выделения в снимке (по умолчанию — последнем)."""
+        stats = self._get(snapshot_id).snapshot.statistics(group_by)
+        return [_stat(stat, group_by) for stat in stats[:limit]]
+
+    def diff(
+        self, base_id: int, snapshot_id: Optional[int] = None, group_by: str = "lineno", limit: int = 30
+    ) -> List[dict]:
+        """Разница снимков: места с наибольшим ростом занятой памяти."""
+        base = self._get(base_id)
+        target = self._get(snapshot_id)
+        stats = target.snapshot.compare_to(base.snapshot, group_by)
+        return [_stat(stat, group_by) for stat in stats[:limit]]
+
+    def status(self) -> dict:
+        status = {"active": self.active, "frames": self.frames if self.active else None, "started_at": self.started_at}
+        if self.active:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update(
+                traced_bytes=current,
+                traced_peak_bytes=peak,
+                overhead_bytes=tracemalloc.get_tracemalloc_memory(),
+            )
+        status["snapshots"] = [taken.info() for taken in self._snapshots]
+        return status
+
+allocation_tracker = AllocationTracker(settings.ALLOC_TRACE_MAX_SNAPSHOTS, settings.ALLOC_TRACE_MAX_DURATION)
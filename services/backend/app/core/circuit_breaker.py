@@ -0,0 +1,126 @@
+"""Автомат-предохранитель (circuit breaker) для внешних зависимостей.
+
+Состояния:
+- closed — вызовы идут как обычно, подряд идущие ошибки считаются;
+- open — после failure_threshold ошибок подряд вызовы сразу завершаются
+  CircuitOpenError, не дожидаясь таймаутов;
+- half_open — через reset_timeout пропускается один пробный вызов:
+  успех закрывает автомат, ошибка снова его открывает.
+"""
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple, Type
+
+from app.core.logger import logger
+from app.core.metrics import registry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+breaker_state = registry.gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state: 0 closed, 1 open, 2 half-open",
+    ("name",),
+)
+breaker_rejected = registry.counter(
+    "circuit_breaker_rejected_total",
+    "Calls rejected without reaching the dependency because the circuit was open",
+    ("name",),
+)
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 5.0,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._degraded_since: Optional[float] = None
+        self._probe_in_flight = False
+        breaker_state.set(_STATE_VALUES[CLOSED], name=name)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def degraded_seconds(self) -> float:
+        """Сколько секунд зависимость отвечает ошибками (0, если всё в порядке)."""
+        if self._degraded_since is None:
+            return 0.0
+        return time.monotonic() - self._degraded_since
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(f"Circuit breaker '{self.name}': {self._state} -> {state}")
+        self._state = state
+        breaker_state.set(_STATE_VALUES[state], name=self.name)
+
+    def before_call(self) -> bool:
+        """Разрешает вызов или бросает CircuitOpenError. Возвращает True для пробного вызова."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._set_state(HALF_OPEN)
+            self._probe_in_flight = True
+            return True
+        breaker_rejected.inc(name=self.name)
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self, probe: bool = False) -> None:
+        if probe:
+            self._probe_in_flight = False
+        self._failures = 0
+        self._degraded_since = None
+        if self._state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self, probe: bool = False) -> None:
+        if probe:
+            self._probe_in_flight = False
+        self._failures += 1
+        if self._degraded_since is None:
+            self._degraded_since = time.monotonic()
+        if probe or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    async def call(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        probe = self.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure(probe)
+            raise
+        except Exception:
+            # Прикладная ошибка (например, ResponseError) — зависимость ответила
+            self.record_success(probe)
+            raise
+        except BaseException:
+            # Отмена вызова ничего не говорит о доступности — состояние не меняем
+            if probe:
+                self._probe_in_flight = False
+            raise
+        self.record_success(probe)
+        return result
+
+    def reset(self) -> None:
+        self._failures = 0
+        self._degraded_since = None
+        self._probe_in_flight = False
+        self._set_state(CLOSED)
@@ -0,0 +1,182 @@
+"""Сжатие ответов: gzip или brotli по Accept-Encoding.
+
+CompressionMiddleware сжимает текстовые ответы (JSON, HTML, text/*) не меньше
+COMPRESSION_MINIMUM_SIZE байт. Потоковые ответы (StreamingResponse) сжимаются
+по частям: после первых MINIMUM_SIZE байт каждая часть сбрасывается клиенту
+сразу, без накопления всего тела.
+Ответы, у которых Content-Encoding уже задан (готовые варианты CachedAsset
+из app/core/openapi.py), передаются как есть.
+
+brotli — необязательная зависимость: без пакета brotli используется только gzip.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - зависит от окружения
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+# Сжатие событий по частям задерживает их доставку клиенту
+EXCLUDED_TYPES = ("text/event-stream",)
+
+def supported_encodings() -> tuple:
+    """Кодировки в порядке предпочтения сервера."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Выбирает кодировку по заголовку Accept-Encoding (с учётом q-значений) или None."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str, *, best: bool = False) -> bytes:
+    """Сжатие целого тела. best=True — максимальная степень для однократно сжимаемых ресурсов."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if best else settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = _GzipStream(9 if best else settings.COMPRESSION_GZIP_LEVEL)
+    return compressor.finish(body)
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits=31 — формат gzip (заголовок и CRC), а не «голый» deflate
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, chunk: bytes) -> bytes:
+        # Z_SYNC_FLUSH отдаёт клиенту всё, что накоплено к концу части
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush()
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self, chunk: bytes = b"") -> bytes:
+        return self._compressor.process(chunk) + self._compressor.finish()
+
+def _stream(encoding: str):
+    if encoding == "br":
+        return _BrotliStream(settings.COMPRESSION_BROTLI_QUALITY)
+    return _GzipStream(settings.COMPRESSION_GZIP_LEVEL)
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(EXCLUDED_TYPES)
+    )
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        pending = b""
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, pending, stream, passthrough
+            if message["type"] == "http.response.start":
+                # Заголовки отправляются вместе с телом, когда ясно, сжимать ли его
+                start = message
+                headers = Headers(raw=message["headers"])
+                content_length = headers.get("content-length")
+                passthrough = not is_compressible(headers) or (
+                    content_length is not None and int(content_length) < self.minimum_size
+                )
+                if passthrough:
+                    await send(start)
+                    start = None
+                return
+            if passthrough or message["type"] != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                # Тело может приходить частями (например, через BaseHTTPMiddleware):
+                # копим его, пока не наберётся порог или не придёт последняя часть
+                pending += body
+                if more_body and len(pending) < self.minimum_size:
+                    return
+                body, pending = pending, b""
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                stream = _stream(encoding)
+                headers["Content-Encoding"] = encoding
+                # Тело меняется, поэтому ETag ответа становится слабым (RFC 9110, 8.8.1)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = stream.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+                if not more_body:
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            body = stream.process(body) if more_body else stream.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
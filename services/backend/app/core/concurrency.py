@@ -0,0 +1,125 @@
+"""Адаптивное ограничение числа одновременных запросов воркера (load shedding).
+
+Лимит подбирается по наблюдаемой задержке (алгоритм Gradient, как в
+Netflix concurrency-limits): сравниваются короткое и длинное скользящее
+среднее времени ответа. Пока задержка стабильна, лимит растёт примерно на
+sqrt(limit); когда очередь начинает расти и короткое среднее уходит вверх,
+лимит уменьшается пропорционально. Запросы сверх лимита сразу получают
+503 с Retry-After вместо ожидания в общей очереди.
+
+Маршруты разделены на классы приоритета: низкоприоритетным доступна лишь
+часть лимита, поэтому под нагрузкой они отклоняются первыми, а остаток
+лимита всегда остаётся для health-проверок и обновления токенов.
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+
+# Доля лимита, доступная классу
+PRIORITY_SHARE: Dict[str, float] = {HIGH: 1.0, NORMAL: 0.9, LOW: 0.5}
+
+# Классы маршрутов (по префиксу пути); остальные — NORMAL
+ROUTE_PRIORITIES: Tuple[Tuple[str, str], ...] = (
+    ("/api/health", HIGH),
+    # Проба Traefik (loadbalancer.healthcheck): отказ в ней под нагрузкой выводит из ротации
+    # здоровые задачи, и нагрузка на оставшиеся только растёт
+    ("/api/ready", HIGH),
+    ("/api/metrics", HIGH),
+    ("/api/auth/refresh", HIGH),
+    ("/api/admin/", LOW),
+)
+# Длинные по замыслу запросы (профилирование) не проходят через лимит:
+# их время ответа не говорит о перегрузке и исказило бы оценку задержки
+UNMETERED_PREFIXES: Tuple[str, ...] = ("/api/admin/debug/",)
+
+concurrency_limit = registry.gauge(
+    "concurrency_limit",
+    "Current adaptive concurrency limit of the worker",
+)
+concurrency_in_flight = registry.gauge(
+    "concurrency_in_flight",
+    "Requests currently being processed by the worker",
+)
+concurrency_requests = registry.counter(
+    "concurrency_requests_total",
+    "Requests admitted or shed by the concurrency limiter, by priority",
+    ("priority", "result"),
+)
+
+def route_priority(path: str) -> str:
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return priority
+    return NORMAL
+
+def is_unmetered(path: str) -> bool:
+    return path.startswith(UNMETERED_PREFIXES)
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float,
+        max_limit: float,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        # Во сколько раз короткое среднее может превысить длинное без снижения лимита
+        self.tolerance = tolerance
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._short_alpha = 0.2
+        self._long_rtt: Optional[float] = None
+        self._short_rtt: Optional[float] = None
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        concurrency_limit.set(self.limit)
+
+    def try_acquire(self, priority: str = NORMAL) -> bool:
+        if self.in_flight >= self.limit * PRIORITY_SHARE[priority]:
+            concurrency_requests.inc(priority=priority, result="shed")
+            return False
+        self.in_flight += 1
+        concurrency_in_flight.set(self.in_flight)
+        concurrency_requests.inc(priority=priority, result="admitted")
+        return True
+
+    def release(self, latency: float) -> None:
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        concurrency_in_flight.set(self.in_flight)
+        self._update(latency, in_flight)
+
+    def _update(self, latency: float, in_flight: int) -> None:
+        if self._long_rtt is None:
+            self._long_rtt = self._short_rtt = latency
+            return
+        self._short_rtt += self._short_alpha * (latency - self._short_rtt)
+        self._long_rtt += self._long_alpha * (latency - self._long_rtt)
+        # После перегрузки длинное среднее завышено — быстрее возвращаем его к норме
+        if self._long_rtt > 2 * self._short_rtt:
+            self._long_rtt *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / max(self._short_rtt, 1e-9)))
+        # Лимит не растёт, пока воркер использует меньше половины лимита
+        if gradient == 1.0 and in_flight < self.limit / 2:
+            return
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        concurrency_limit.set(self.limit)
+
+concurrency_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+    min_limit=settings.CONCURRENCY_MIN_LIMIT,
+    max_limit=settings.CONCURRENCY_MAX_LIMIT,
+)
@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 def get_secret(secret_name: str, default: str | None = None) -> str | None:
@@ -20,6 +21,9 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI Swarm Project"
     
     SECRET_KEY: str = get_secret("SECRET_KEY", "secret-key")
+    # Токен Prometheus для /api/metrics (Authorization: Bearer); пусто — без проверки,
+    # путь и так не маршрутизируется Traefik наружу
+    METRICS_TOKEN: str = get_secret("METRICS_TOKEN", "")
     
     # Database settings
     DB_HOST: str = "localhost"
@@ -46,6 +50,94 @@ class Settings(BaseSettings):
     REDIS_SSL: bool = False
     REDIS_CONNECT_TIMEOUT: float = 1.0
     REDIS_READ_TIMEOUT: float = 1.0
+    # Пул соединений: не больше MAX_CONNECTIONS на воркер, ожидание свободного — POOL_TIMEOUT секунд
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Клиентский кэш (RESP3 CLIENT TRACKING) для ключей с указанными префиксами
+    REDIS_CLIENT_CACHE_ENABLED: bool = False
+    REDIS_CLIENT_CACHE_PREFIXES: list[str] = ["denylist:"]
+    REDIS_CLIENT_CACHE_MAX_KEYS: int = 10000
+    REDIS_CLIENT_CACHE_TTL: float = 60.0
+    # Sentinel: список "host:port"; если пуст, используется одиночный Redis по REDIS_HOST/REDIS_PORT
+    REDIS_SENTINELS: list[str] = []
+    REDIS_SENTINEL_MASTER: str = "mymaster"
+    REDIS_SENTINEL_PASSWORD: str | None = get_secret("REDIS_SENTINEL_PASSWORD")
+    # Чтение (например, кэш страниц списка пользователей) из реплик; сначала пробуется реплика на этой же ноде.
+    # Denylist и метки версий всегда читаются с мастера
+    REDIS_READ_FROM_REPLICAS: bool = False
+    # Адрес реплики на этой ноде; "gateway" — шлюз контейнера (адрес ноды в docker_gwbridge)
+    REDIS_LOCAL_REPLICA_HOST: str | None = None
+    REDIS_LOCAL_REPLICA_PORT: int = 6379
+    # Circuit breaker: после N ошибок подряд Redis считается недоступным на RESET_TIMEOUT секунд
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5
+    REDIS_BREAKER_RESET_TIMEOUT: float = 5.0
+    # Поведение при недоступности Redis: fail_open — продолжить без проверки, fail_closed — 503
+    REDIS_DENYLIST_CHECK_POLICY: Literal["fail_open", "fail_closed"] = "fail_open"
+    REDIS_REFRESH_POLICY: Literal["fail_open", "fail_closed"] = "fail_closed"
+    # Ограничение частоты запросов (правила — app/core/ratelimit.py, RATE_LIMITS)
+    RATE_LIMIT_ENABLED: bool = True
+    # Защита входа: блокировка аккаунта/подсети с экспоненциальной задержкой после N ошибок
+    LOGIN_SHIELD_ACCOUNT_FREE_FAILURES: int = 5
+    LOGIN_SHIELD_SUBNET_FREE_FAILURES: int = 50
+    LOGIN_SHIELD_FAILURE_WINDOW: int = 900
+    LOGIN_SHIELD_BASE_DELAY: float = 1.0
+    LOGIN_SHIELD_MAX_DELAY: float = 900.0
+    # Попыток входа, дошедших до проверки пароля (Argon2), в секунду на воркер; расходуется
+    # и для несуществующих аккаунтов, чтобы 503 не выдавал их существование
+    LOGIN_HASH_BUDGET_PER_SECOND: float = 20.0
+    REDIS_LOGIN_SHIELD_POLICY: Literal["fail_open", "fail_closed"] = "fail_open"
+    # Адаптивный лимит одновременных запросов на воркер; сверх лимита — 503 с Retry-After
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_INITIAL_LIMIT: int = 50
+    CONCURRENCY_MIN_LIMIT: int = 10
+    CONCURRENCY_MAX_LIMIT: int = 500
+    # Бюджет времени запроса по умолчанию, секунды (бюджеты маршрутов — app/core/deadline.py)
+    REQUEST_TIMEOUT_DEFAULT: float = 10.0
+    # Фоновая проверка зависимостей для /api/ready
+    HEALTH_CHECK_INTERVAL: float = 5.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+    # Плавная остановка: файл-флаг создаёт entrypoint.sh по SIGTERM
+    SHUTDOWN_DRAIN_FLAG_FILE: str = "/tmp/draining"
+    # Прогрев воркера при старте (app/core/startup.py)
+    STARTUP_PROFILE: bool = False
+    STARTUP_WARMUP_TIMEOUT: float = 5.0
+    STARTUP_WARM_DB_CONNECTIONS: int = 5
+    STARTUP_WARM_REDIS_CONNECTIONS: int = 4
+    # Готовая схема OpenAPI (собирается в Dockerfile: python -m app.core.openapi build)
+    OPENAPI_ARTIFACT_PATH: str = "openapi.json"
+    # Сжатие ответов (app/core/compression.py); ответы меньше MINIMUM_SIZE байт не сжимаются
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Время жизни меток версий для ETag (app/core/versions.py), секунды
+    ETAG_VERSION_TTL: int = 86400
+    # Кэш страниц списка пользователей в Redis (app/core/result_cache.py), секунды
+    ADMIN_USERS_CACHE_TTL: int = 300
+    # Общий кэш воркеров в разделяемой памяти (app/core/shm_cache.py): SLOTS * SLOT_SIZE байт в /dev/shm
+    SHM_CACHE_ENABLED: bool = True
+    SHM_CACHE_PATH: str = "/dev/shm/fastapi-swarm-cache"
+    SHM_CACHE_SLOTS: int = 1024
+    SHM_CACHE_SLOT_SIZE: int = 16384
+    # Плавный перезапуск воркера при уникальной памяти (USS) больше порога (0 — не проверять), см. app/core/runtime.py
+    WORKER_MAX_USS_MB: int = 512
+    WORKER_MEMORY_CHECK_INTERVAL: float = 30.0
+    # Задержка цикла событий (app/core/loop_monitor.py): стек пишется в лог, если цикл стоит дольше порога
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_LAG_THRESHOLD: float = 0.25
+    # Трассировка выделений памяти (app/core/allocations.py): снимков в памяти и предельная длительность, секунды
+    ALLOC_TRACE_MAX_SNAPSHOTS: int = 10
+    ALLOC_TRACE_MAX_DURATION: float = 3600.0
+    # Трассировка запросов (app/core/tracing.py): разбивка медленных запросов в журнале
+    # и экспорт трасс JSON-строками в TRACE_EXPORT_PATH (пусто — не экспортировать).
+    # Server-Timing виден всем клиентам, поэтому по умолчанию выключен
+    TRACING_ENABLED: bool = True
+    SERVER_TIMING_ENABLED: bool = False
+    TRACE_SLOW_THRESHOLD: float = 1.0
+    TRACE_SAMPLE_RATE: float = 0.01
+    TRACE_EXPORT_PATH: str = ""
 
     CORS_ORIGINS: list[str] = [
         "http://localhost:3000",
@@ -0,0 +1,106 @@
+"""Дедлайны запросов.
+
+Каждый запрос получает бюджет времени: по маршруту (ROUTE_BUDGETS) или
+меньший, если его передал вызывающий в заголовке X-Request-Timeout-Ms.
+Абсолютный дедлайн хранится в contextvar и учитывается во всех местах,
+где запрос может надолго занять ресурсы: при запросах к Postgres (timeout
+asyncpg), командах Redis и перед проверкой пароля. По истечении бюджета
+оставшаяся работа отменяется, клиент получает 504, соединения возвращаются
+в пулы.
+"""
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+# Отладочные маршруты (профилирование) долго ждут, но не держат запросы к БД
+DEBUG_ROUTE_PREFIX = "/api/admin/debug/"
+
+# Бюджет маршрутов (по префиксу пути), секунды; остальным — REQUEST_TIMEOUT_DEFAULT
+ROUTE_BUDGETS: Tuple[Tuple[str, float], ...] = (
+    ("/api/health", 1.0),
+    ("/api/metrics", 2.0),
+    ("/api/auth/login", 5.0),
+    ("/api/auth/refresh", 5.0),
+    # Профилирование длится столько, сколько запросил администратор (до 60 с)
+    (DEBUG_ROUTE_PREFIX, 90.0),
+    ("/api/admin/", 15.0),
+)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+deadline_exceeded = registry.counter(
+    "request_deadline_exceeded_total",
+    "Requests cancelled because their deadline expired, by stage",
+    ("stage",),
+)
+
+class DeadlineExceeded(Exception):
+    pass
+
+def route_budget(path: str) -> float:
+    for prefix, budget in ROUTE_BUDGETS:
+        if path.startswith(prefix):
+            return budget
+    return settings.REQUEST_TIMEOUT_DEFAULT
+
+def max_budget() -> float:
+    """Наибольший бюджет маршрутов, работающих с БД (потолок statement_timeout); отладочные не учитываются."""
+    return max([
+        settings.REQUEST_TIMEOUT_DEFAULT,
+        *(budget for prefix, budget in ROUTE_BUDGETS if not prefix.startswith(DEBUG_ROUTE_PREFIX)),
+    ])
+
+def request_budget(path: str, header: Optional[str]) -> float:
+    """Бюджет запроса: заголовок может только сократить бюджет маршрута."""
+    budget = route_budget(path)
+    if header:
+        try:
+            budget = min(budget, max(int(header), 0) / 1000)
+        except ValueError:
+            pass
+    return budget
+
+def set_deadline(budget: float):
+    return _deadline.set(time.monotonic() + budget)
+
+def reset_deadline(token) -> None:
+    _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до дедлайна текущего запроса (None — дедлайна нет)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def check(stage: str) -> None:
+    """Бросает DeadlineExceeded, если бюджет уже исчерпан (перед дорогой операцией)."""
+    left = remaining()
+    if left is not None and left <= 0:
+        deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceeded(stage)
+
+@contextlib.asynccontextmanager
+async def bounded(stage: str):
+    """Ограничивает блок оставшимся бюджетом запроса; вне запроса ничего не делает."""
+    left = remaining()
+    if left is None:
+        yield
+        return
+    check(stage)
+    timeout = asyncio.timeout(left)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError:
+        # TimeoutError самого вызова (например, сокета Redis) пробрасываем как есть
+        if not timeout.expired():
+            raise
+        deadline_exceeded.inc(stage=stage)
+        raise DeadlineExceeded(stage) from None
@@ -0,0 +1,148 @@
+"""Фоновая проверка зависимостей для readiness.
+
+Монитор запускается в lifespan и раз в HEALTH_CHECK_INTERVAL секунд
+проверяет Postgres, Redis и хранилище ограничителя частоты запросов.
+/api/ready лишь отдаёт последний результат, поэтому частые пробы не
+создают нагрузку на зависимости и не замедляются вместе с ними.
+
+Критичные проверки (critical=True) определяют готовность; сбой остальных
+переводит статус в degraded — приложение продолжает обслуживать запросы
+по политикам деградации. Устаревший результат (монитор завис) считается
+неготовностью, как и начавшаяся остановка задачи (см. app/core/lifecycle.py).
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.lifecycle import is_draining
+from app.core.logger import logger
+from app.core.metrics import registry
+
+health_check_up = registry.gauge(
+    "health_check_up",
+    "Result of the last background dependency check (1 - ok, 0 - failed)",
+    ("check",),
+)
+health_check_latency = registry.gauge(
+    "health_check_latency_seconds",
+    "Duration of the last background dependency check",
+    ("check",),
+)
+
+@dataclass
+class CheckResult:
+    ok: bool
+    latency: float
+    checked_at: float
+    error: Optional[str] = None
+
+class HealthMonitor:
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self._checks: Dict[str, Callable[[], Awaitable[None]]] = {}
+        self._critical: Dict[str, bool] = {}
+        self._results: Dict[str, CheckResult] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: Callable[[], Awaitable[None]], critical: bool = True) -> None:
+        self._checks[name] = check
+        self._critical[name] = critical
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe(self, name: str, check) -> None:
+        start = time.monotonic()
+        error = None
+        try:
+            await asyncio.wait_for(check(), self.timeout)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        result = CheckResult(error is None, time.monotonic() - start, time.time(), error)
+        previous = self._results.get(name)
+        if previous is not None and previous.ok != result.ok:
+            if result.ok:
+                logger.info(f"Health check '{name}' recovered")
+            else:
+                logger.warning(f"Health check '{name}' failed: {error}")
+        self._results[name] = result
+        health_check_up.set(1 if result.ok else 0, check=name)
+        health_check_latency.set(result.latency, check=name)
+
+    async def run_once(self) -> None:
+        await asyncio.gather(*(self._probe(name, check) for name, check in self._checks.items()))
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> dict:
+        if is_draining():
+            # Задача останавливается: новые запросы должны уйти на другие реплики
+            return {"status": "draining", "ready": False, "checks": {}}
+        now = time.time()
+        stale_after = self.interval * 3 + self.timeout
+        checks = {}
+        ready = bool(self._checks)
+        degraded = False
+        for name in self._checks:
+            result = self._results.get(name)
+            if result is None:
+                checks[name] = {"status": "unknown", "critical": self._critical[name]}
+                ready = ready and not self._critical[name]
+                continue
+            age = now - result.checked_at
+            stale = age > stale_after
+            ok = result.ok and not stale
+            checks[name] = {
+                "status": "ok" if ok else "error",
+                "critical": self._critical[name],
+                "latency_ms": round(result.latency * 1000, 2),
+                "age_seconds": round(age, 2),
+                "stale": stale,
+            }
+            if result.error:
+                checks[name]["error"] = result.error
+            if not ok:
+                if self._critical[name]:
+                    ready = False
+                else:
+                    degraded = True
+        status = "ready" if ready else "not_ready"
+        if ready and degraded:
+            status = "degraded"
+        return {"status": status, "ready": ready, "checks": checks}
+
+async def check_database() -> None:
+    from app.db.session import engine
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+async def check_redis() -> None:
+    from app.core.redis import redis_client
+    await redis_client.ping()
+
+async def check_rate_limiter() -> None:
+    from app.core.ratelimit import limiter
+    await limiter.warm_up()
+
+health_monitor = HealthMonitor(settings.HEALTH_CHECK_INTERVAL, settings.HEALTH_CHECK_TIMEOUT)
+health_monitor.register("database", check_database)
+health_monitor.register("redis", check_redis, critical=False)
+health_monitor.register("rate_limiter", check_rate_limiter, critical=False)
@@ -0,0 +1,17 @@
+"""Плавная остановка воркера.
+
+Остановка задачи Swarm проходит в два этапа:
+1. entrypoint.sh получает SIGTERM, создаёт файл SHUTDOWN_DRAIN_FLAG_FILE и ждёт
+   SHUTDOWN_DRAIN_DELAY секунд: /api/ready начинает отвечать 503, Traefik убирает
+   задачу из балансировки, но уже отправленные запросы обслуживаются;
+2. затем SIGTERM получает gunicorn: воркеры перестают принимать соединения,
+   uvicorn дожидается незавершённых запросов (не дольше graceful_timeout),
+   после чего lifespan закрывает пулы соединений.
+"""
+import os
+
+from app.core.config import settings
+
+def is_draining() -> bool:
+    """Началась ли остановка задачи (есть файл-флаг SHUTDOWN_DRAIN_FLAG_FILE)."""
+    return os.path.exists(settings.SHUTDOWN_DRAIN_FLAG_FILE)
@@ -0,0 +1,96 @@
+"""Задержка цикла событий и стеки блокирующих вызовов.
+
+Задача в цикле засыпает на LOOP_MONITOR_INTERVAL и измеряет, насколько
+позже срока проснулась: это задержка, с которой любой готовый к работе
+запрос воркера получает управление. Значения попадают в гистограмму
+event_loop_lag_seconds.
+
+Пока цикл заблокирован синхронным кодом (хеширование пароля, синхронный
+вывод в лог, чтение файла), задача сама ничего измерить не может. Поэтому
+отдельный поток следит за временем последнего тика: если цикл молчит
+дольше LOOP_LAG_THRESHOLD, поток снимает стек потока цикла
+(sys._current_frames) — в нём видна блокирующая функция — и пишет его в
+лог. На одну остановку цикла снимается один стек.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import registry
+
+loop_lag = registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+loop_blocked = registry.counter(
+    "event_loop_blocked_total",
+    "Event loop stalls longer than the lag threshold (a stack is logged for each)",
+)
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_stack: Optional[str] = None
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watcher = threading.Thread(target=self._watch, name="loop-lag-watcher", daemon=True)
+        self._watcher.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+            self._watcher = None
+
+    async def _measure(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(time.perf_counter() - started - self.interval, 0.0))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled > self.threshold and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                self.capture(stalled)
+
+    def capture(self, stalled: float) -> Optional[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        stack = "".join(traceback.format_stack(frame))
+        self.last_stack = stack
+        loop_blocked.inc()
+        logger.warning(f"Event loop blocked for {stalled * 1000:.0f} ms so far, loop thread stack:\n{stack}")
+        return stack
+
+loop_monitor = LoopLagMonitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_LAG_THRESHOLD)
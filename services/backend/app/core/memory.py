@@ -0,0 +1,76 @@
+"""Память процесса: RSS, PSS и уникальная (USS) по /proc/<pid>/smaps_rollup.
+
+USS (Private_Clean + Private_Dirty) — память, которая освободится при
+завершении воркера; именно она умножается на число воркеров. Общие
+страницы (после preload в gunicorn.conf.py) входят в RSS каждого воркера,
+а в PSS — долей.
+
+Отчёт по всем процессам gunicorn внутри контейнера:
+
+    python -m app.core.memory
+"""
+import os
+from typing import Dict
+
+from app.core.metrics import registry
+
+process_memory = registry.gauge(
+    "process_memory_bytes",
+    "Worker memory from smaps_rollup by kind (rss, pss, uss, shared), updated on scrape",
+    ("kind",),
+)
+
+def memory_usage(pid="self") -> Dict[str, int]:
+    """Память процесса в байтах: rss, pss, uss, shared. Пустой словарь вне Linux."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                parts = value.split()
+                if len(parts) == 2 and parts[1] == "kB":
+                    fields[name] = int(parts[0]) * 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+def update_metrics() -> None:
+    for kind, value in memory_usage().items():
+        process_memory.set(value, kind=kind)
+
+def _gunicorn_processes():
+    for pid in sorted(int(name) for name in os.listdir("/proc") if name.isdigit()):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                args = f.read().decode(errors="replace").split("\0")
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        # Исполняемый файл или скрипт (python .../bin/gunicorn), а не упоминание в аргументах
+        if any(os.path.basename(arg).startswith("gunicorn") for arg in args[:2]):
+            yield pid, ppid
+
+def _main() -> None:
+    processes = list(_gunicorn_processes())
+    pids = {pid for pid, _ in processes}
+    print(f"{'pid':>8} {'role':8} {'rss MiB':>9} {'pss MiB':>9} {'uss MiB':>9}")
+    total_pss = 0
+    for pid, ppid in processes:
+        usage = memory_usage(pid)
+        if not usage:
+            continue
+        total_pss += usage["pss"]
+        role = "worker" if ppid in pids else "master"
+        print(
+            f"{pid:>8} {role:8} {usage['rss'] / 2**20:9.1f} {usage['pss'] / 2**20:9.1f} {usage['uss'] / 2**20:9.1f}"
+        )
+    print(f"Total PSS: {total_pss / 2**20:.1f} MiB")
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,180 @@
+"""Готовая схема OpenAPI и страницы документации из памяти.
+
+Схема собирается один раз — при сборке образа (см. Dockerfile) или при
+первом обращении, после чего сохраняется на диск для остальных воркеров.
+Воркер держит в памяти готовые байты JSON, их сжатые варианты и ETag, так что
+запрос /api/openapi.json не требует ни генерации схемы, ни сериализации.
+
+Перед использованием артефакта с диска проверяется, что он описывает те же
+маршруты, что и приложение; устаревший артефакт пересобирается.
+
+Сборка и проверка вручную (из services/backend):
+
+    python -m app.core.openapi build
+    python -m app.core.openapi check   # код возврата 1, если артефакт устарел
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Optional, Set
+
+from fastapi import FastAPI, Request, Response
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.routing import APIRoute
+
+from app.core.compression import compress, negotiate, supported_encodings
+from app.core.config import settings
+from app.core.logger import logger
+
+def route_signature(app: FastAPI) -> Set[str]:
+    """Маршруты приложения, которые должны быть в схеме: {"GET /api/health", ...}."""
+    signature = set()
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.include_in_schema:
+            signature.update(f"{method} {route.path_format}" for method in route.methods)
+    return signature
+
+def schema_signature(schema: dict) -> Set[str]:
+    return {
+        f"{method.upper()} {path}"
+        for path, operations in schema.get("paths", {}).items()
+        for method in operations
+    }
+
+def render_schema(app: FastAPI) -> bytes:
+    # ensure_ascii=False: русские описания занимают вдвое меньше, чем в виде \\uXXXX
+    return json.dumps(app.openapi(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class CachedAsset:
+    """Неизменяемый ответ: тело, сжатые с максимальной степенью варианты и ETag считаются один раз."""
+    def __init__(self, body: bytes, media_type: str):
+        self.body = body
+        self.encoded = {encoding: compress(body, encoding, best=True) for encoding in supported_encodings()}
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.media_type = media_type
+
+    def response(self, request: Request) -> Response:
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": "public, max-age=0, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(self.encoded[encoding], media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+class OpenAPIArtifact:
+    def __init__(self, app: FastAPI, path: Optional[str]):
+        self.app = app
+        self.path = path
+        self._asset: Optional[CachedAsset] = None
+
+    def _load_from_disk(self) -> Optional[bytes]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                body = f.read()
+            if schema_signature(json.loads(body)) != route_signature(self.app):
+                logger.warning(f"OpenAPI artifact {self.path} does not match application routes, rebuilding")
+                return None
+            return body
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load OpenAPI artifact {self.path}: {e}")
+            return None
+
+    def _save(self, body: bytes) -> None:
+        # Атомарная запись: другие воркеры не прочитают файл наполовину
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".openapi-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save OpenAPI artifact {self.path}: {e}")
+
+    @property
+    def asset(self) -> CachedAsset:
+        if self._asset is None:
+            body = self._load_from_disk()
+            if body is None:
+                body = render_schema(self.app)
+                if self.path:
+                    self._save(body)
+            self._asset = CachedAsset(body, "application/json")
+        return self._asset
+
+def install(app: FastAPI) -> OpenAPIArtifact:
+    """Заменяет стандартные маршруты схемы и документации FastAPI на отдачу готовых ответов."""
+    # В DEBUG схема меняется вместе с кодом, поэтому артефакт на диске не используется
+    artifact = OpenAPIArtifact(app, None if settings.DEBUG else settings.OPENAPI_ARTIFACT_PATH)
+    swagger = CachedAsset(
+        get_swagger_ui_html(
+            openapi_url=app.openapi_url,
+            title=f"{app.title} - Swagger UI",
+            oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,
+            init_oauth=app.swagger_ui_init_oauth,
+            swagger_ui_parameters=app.swagger_ui_parameters,
+        ).body,
+        "text/html; charset=utf-8",
+    )
+    redoc = CachedAsset(
+        get_redoc_html(openapi_url=app.openapi_url, title=f"{app.title} - ReDoc").body,
+        "text/html; charset=utf-8",
+    )
+
+    async def openapi(request: Request) -> Response:
+        return artifact.asset.response(request)
+
+    async def swagger_ui_html(request: Request) -> Response:
+        return swagger.response(request)
+
+    async def redoc_html(request: Request) -> Response:
+        return redoc.response(request)
+
+    replaced = {app.openapi_url: openapi, app.docs_url: swagger_ui_html, app.redoc_url: redoc_html}
+    app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) not in replaced]
+    for path, endpoint in replaced.items():
+        app.add_route(path, endpoint, include_in_schema=False)
+    return artifact
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Build or verify the prebuilt OpenAPI artifact")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--output", default=settings.OPENAPI_ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    from app.main import app
+
+    if args.command == "build":
+        body = render_schema(app)
+        with open(args.output, "wb") as f:
+            f.write(body)
+        print(f"OpenAPI schema written to {args.output} ({len(body)} bytes)")
+        return
+
+    try:
+        with open(args.output, "rb") as f:
+            schema = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot read {args.output}: {e}")
+    missing = route_signature(app) - schema_signature(schema)
+    stale = schema_signature(schema) - route_signature(app)
+    if missing or stale or json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode("utf-8") != render_schema(app):
+        for item in sorted(missing):
+            print(f"missing from artifact: {item}")
+        for item in sorted(stale):
+            print(f"not in application: {item}")
+        sys.exit(f"{args.output} is out of date, run: python -m app.core.openapi build")
+    print(f"{args.output} matches application routes")
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,153 @@
+"""Статистический профилировщик CPU воркера.
+
+С заданной частотой снимается стек потока цикла событий и считаются
+одинаковые стеки. Код приложения не инструментируется, поэтому накладные
+расходы — только на снятие стека (порядка десятков микросекунд за выборку),
+и только пока идёт профилирование.
+
+В воркере uvicorn цикл работает в главном потоке, и выборки делает таймер
+ITIMER_PROF: SIGPROF приходит по процессорному времени, а обработчик
+получает кадр, который в этот момент выполнялся. Простой в select выборок
+не даёт, число выборок / rate — процессорное время. Поток-сэмплер
+(sys._current_frames) для этого не годится: GIL он получает, когда цикл сам
+его отпускает, то есть почти всегда в select, и короткие участки
+вычислений между вводом-выводом в профиль не попадают. Он остаётся
+запасным вариантом, когда цикл не в главном потоке (TestClient).
+
+Результат — свёрнутые стеки (формат flamegraph.pl / speedscope:
+"корень;...;лист число") или JSON speedscope (https://www.speedscope.app).
+"""
+import asyncio
+import os
+import signal
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+Frame = Tuple[str, str, int]
+
+_ROOTS = sorted({p for p in sys.path if p and os.path.isdir(p)}, key=len, reverse=True)
+
+def short_path(filename: str) -> str:
+    for root in _ROOTS:
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, short_path(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+def frame_name(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({filename}:{line})"
+
+class ProfilerBusy(Exception):
+    pass
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, rate: int = 100) -> Tuple[Counter, int]:
+        """Профилирует поток цикла событий seconds секунд; возвращает (стеки -> число выборок, число выборок)."""
+        if self._lock.locked():
+            raise ProfilerBusy()
+        async with self._lock:
+            samples: Counter = Counter()
+            interval = 1.0 / rate
+            if threading.current_thread() is threading.main_thread():
+                await self._profile_signal(samples, seconds, interval)
+            else:
+                await self._profile_thread(samples, seconds, interval)
+            return samples, sum(samples.values())
+
+    @staticmethod
+    async def _profile_signal(samples: Counter, seconds: float, interval: float) -> None:
+        def handler(signum, frame) -> None:
+            if frame is not None:
+                samples[_stack(frame)] += 1
+
+        previous = signal.signal(signal.SIGPROF, handler)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+
+    @staticmethod
+    async def _profile_thread(samples: Counter, seconds: float, interval: float) -> None:
+        target = threading.get_ident()
+        stop = threading.Event()
+
+        def sample() -> None:
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    samples[_stack(frame)] += 1
+
+        sampler = threading.Thread(target=sample, name="cpu-profiler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+
+def collapsed(samples: Counter) -> str:
+    lines = [
+        f"{';'.join(frame_name(frame) for frame in stack)} {count}"
+        for stack, count in samples.most_common()
+    ]
+    return "\n".join(lines) + "\n"
+
+def speedscope(samples: Counter, name: str, rate: int) -> dict:
+    frames: List[dict] = []
+    index: Dict[Frame, int] = {}
+    profile_samples, weights = [], []
+    for stack, count in samples.most_common():
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            ids.append(index[frame])
+        profile_samples.append(ids)
+        weights.append(count / rate)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "fastapi-swarm-backend",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": profile_samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+cpu_profiler = SamplingProfiler()
+
+def node_name() -> str:
+    return os.getenv("NODE_NAME", "local-development")
+
+def worker_labels(extra: Optional[dict] = None) -> dict:
+    """Заголовки ответа с воркером и нодой, с которых снят профиль."""
+    return {"X-Worker-Id": str(os.getpid()), "X-Node-Name": node_name(), **(extra or {})}
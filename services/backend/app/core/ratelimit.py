@@ -0,0 +1,283 @@
+"""Гибридный ограничитель частоты запросов: локальные токены воркера + Redis.
+
+Лимиты всех маршрутов описаны декларативно в RATE_LIMITS. Семантика —
+скользящее окно (счётчики текущего и предыдущего окна в Redis, вклад
+предыдущего окна убывает линейно).
+
+Воркер не ходит в Redis на каждый запрос: он арендует у Redis пачку
+токенов (lease) одним атомарным Lua-вызовом и дальше расходует их локально.
+Пока токены есть, проверка стоит микросекунды; отказ тоже кэшируется
+локально до момента, когда в окне может освободиться место. Размер пачки
+ограничивает возможное «переиспользование» лимита воркерами сверху: токены,
+арендованные, но не израсходованные до конца окна, просто сгорают.
+
+Пачка — 5% лимита, поэтому при лимите меньше 40 (вход — 5 в минуту с IP,
+регистрация — 10) она равна одному токену и каждый разрешённый запрос
+всё-таки обращается в Redis. Это сделано намеренно: пачка крупнее отдала бы
+заметную долю маленького лимита одному воркеру, и запросы того же клиента
+на других воркерах получали бы отказ раньше лимита. Локально в этом случае
+кэшируется только отказ.
+
+Число корзин в воркере ограничено (max_buckets): при переполнении сначала
+удаляются устаревшие, затем самые старые. Вытесненная корзина теряет только
+локальные токены и кэш отказа — сам лимит по-прежнему считает Redis.
+
+При недоступности Redis каждое правило ведёт себя согласно on_redis_error:
+- local — лимит считается только внутри воркера (тот же limit на воркер);
+- allow — запрос пропускается;
+- deny — запрос отклоняется с 503.
+"""
+import hashlib
+import itertools
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.logger import logger
+from app.core.metrics import registry
+from app.core.redis import redis_client
+from app.core.singleflight import SingleFlight
+from app.core.tracing import span
+
+LOCAL = "local"
+ALLOW = "allow"
+DENY = "deny"
+
+@dataclass(frozen=True)
+class Rule:
+    # "ip" — по адресу клиента, "form:<поле>" — по значению поля формы (например, аккаунт при входе)
+    key: str
+    limit: int
+    window: int
+    # Сколько токенов арендовать у Redis за раз; 0 — 5% лимита (минимум 1)
+    lease: int = 0
+    on_redis_error: str = LOCAL
+
+    @property
+    def lease_size(self) -> int:
+        return self.lease or max(1, self.limit // 20)
+
+# Единая конфигурация лимитов для всех маршрутов
+RATE_LIMITS: Dict[str, Tuple[Rule, ...]] = {
+    "login": (
+        Rule("ip", limit=5, window=60),
+        Rule("form:username", limit=10, window=900),
+    ),
+    "register": (
+        Rule("ip", limit=10, window=60),
+    ),
+    "refresh": (
+        Rule("ip", limit=60, window=60, on_redis_error=ALLOW),
+    ),
+}
+
+# Атомарная аренда токенов в скользящем окне.
+# KEYS[1] — счётчик текущего окна, KEYS[2] — предыдущего.
+# ARGV: limit, вес предыдущего окна (0..1), сколько токенов нужно, TTL ключа.
+LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local available = limit - math.floor(previous * weight) - current
+if available <= 0 then
+    return 0
+end
+local grant = math.min(want, available)
+redis.call('INCRBY', KEYS[1], grant)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return grant
+"""
+
+rate_limit_decisions = registry.counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions by route and result",
+    ("route", "result"),
+)
+
+class _Bucket:
+    __slots__ = ("window_index", "tokens", "denied_until", "local_prev", "local_curr")
+
+    def __init__(self, window_index: int):
+        self.window_index = window_index
+        self.tokens = 0
+        self.denied_until = 0.0
+        self.local_prev = 0
+        self.local_curr = 0
+
+    def roll(self, window_index: int) -> None:
+        if window_index == self.window_index:
+            return
+        self.local_prev = self.local_curr if window_index == self.window_index + 1 else 0
+        self.local_curr = 0
+        # Неизрасходованные токены прошлого окна сгорают
+        self.tokens = 0
+        self.denied_until = 0.0
+        self.window_index = window_index
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float, unavailable: bool = False):
+        self.retry_after = retry_after
+        self.unavailable = unavailable
+
+def client_ip(request: Request) -> str:
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        # Последний адрес добавлен Traefik; предыдущие клиент может подставить сам
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+def account_id(value: str) -> str:
+    """Идентификатор аккаунта для ключей Redis (email не храним в открытом виде)."""
+    return hashlib.sha1(value.strip().lower().encode()).hexdigest()
+
+class HybridRateLimiter:
+    MAX_BUCKETS = 100_000
+
+    def __init__(self, client, limits: Dict[str, Tuple[Rule, ...]], prefix: str = "rl",
+                 max_buckets: int = MAX_BUCKETS):
+        self.limits = limits
+        self.prefix = prefix
+        self.max_buckets = max_buckets
+        self._script = client.register_script(LEASE_SCRIPT)
+        self._buckets: Dict[tuple, _Bucket] = {}
+        self._leases = SingleFlight("rate_limit_lease")
+
+    async def _identity(self, rule: Rule, request: Request) -> Optional[str]:
+        if rule.key == "ip":
+            return client_ip(request)
+        if rule.key.startswith("form:"):
+            form = await request.form()
+            value = form.get(rule.key[len("form:"):])
+            if not value:
+                return None
+            return account_id(str(value))
+        raise ValueError(f"Unknown rate limit key: {rule.key}")
+
+    def _bucket(self, key: tuple, window_index: int) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(window_index)
+            bucket = self._buckets[key] = _Bucket(window_index)
+        bucket.roll(window_index)
+        return bucket
+
+    def _prune(self, window_index: int) -> None:
+        # Удаляем корзины, не использовавшиеся дольше двух окон
+        stale = [key for key, bucket in self._buckets.items() if bucket.window_index < window_index - 1]
+        for key in stale:
+            del self._buckets[key]
+        # Окно правила может быть длинным (900 с для аккаунта): при смене адресов или имён
+        # внутри окна устаревших корзин нет, и вытесняется десятая часть самых старых
+        if len(self._buckets) >= self.max_buckets:
+            for key in list(itertools.islice(self._buckets, max(1, self.max_buckets // 10))):
+                del self._buckets[key]
+
+    async def _lease(self, bucket: _Bucket, rule: Rule, redis_key: str, now: float) -> None:
+        elapsed = now - bucket.window_index * rule.window
+        weight = max(0.0, 1.0 - elapsed / rule.window)
+        granted = await self._script(
+            keys=[f"{redis_key}:{bucket.window_index}", f"{redis_key}:{bucket.window_index - 1}"],
+            args=[rule.limit, f"{weight:.4f}", rule.lease_size, rule.window * 2],
+        )
+        granted = int(granted)
+        if granted > 0:
+            bucket.tokens += granted
+        else:
+            # Место в окне освобождается по мере «старения» предыдущего окна
+            remaining = rule.window - elapsed
+            bucket.denied_until = now + min(remaining, max(1.0, rule.window / rule.limit))
+
+    def _local_check(self, bucket: _Bucket, rule: Rule, now: float) -> bool:
+        elapsed = now - bucket.window_index * rule.window
+        weight = max(0.0, 1.0 - elapsed / rule.window)
+        return bucket.local_prev * weight + bucket.local_curr < rule.limit
+
+    async def _acquire(self, route: str, index: int, rule: Rule, ident: str) -> None:
+        now = time.time()
+        window_index = int(now // rule.window)
+        key = (route, index, ident)
+        bucket = self._bucket(key, window_index)
+        redis_key = f"{self.prefix}:{route}:{index}:{ident}"
+
+        # Аренду повторяем, пока Redis выдаёт токены: если их разобрали параллельные
+        # запросы, место в окне ещё может быть. Отказ Redis выставляет denied_until
+        while True:
+            if bucket.tokens > 0:
+                bucket.tokens -= 1
+                bucket.local_curr += 1
+                return
+            if bucket.denied_until > now:
+                raise RateLimitExceeded(bucket.denied_until - now)
+            try:
+                await self._leases.do(
+                    (key, window_index), lambda: self._lease(bucket, rule, redis_key, now)
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                return self._degraded(route, bucket, rule, now, e)
+
+    def _degraded(self, route: str, bucket: _Bucket, rule: Rule, now: float, error: Exception) -> None:
+        rate_limit_decisions.inc(route=route, result=f"degraded_{rule.on_redis_error}")
+        logger.debug(f"Rate limiter for '{route}' works without Redis ({rule.on_redis_error}): {error}")
+        if rule.on_redis_error == ALLOW:
+            return
+        if rule.on_redis_error == DENY:
+            raise RateLimitExceeded(rule.window, unavailable=True)
+        if not self._local_check(bucket, rule, now):
+            raise RateLimitExceeded(min(rule.window, max(1.0, rule.window / rule.limit)))
+        bucket.local_curr += 1
+
+    async def warm_up(self) -> None:
+        """Проверяет хранилище лимитов и держит Lua-скрипт загруженным в кэш скриптов Redis."""
+        client = self._script.registered_client
+        if not (await client.script_exists(self._script.sha))[0]:
+            await client.script_load(self._script.script)
+
+    async def check(self, route: str, request: Request) -> None:
+        """Бросает RateLimitExceeded, если запрос превышает хотя бы одно правило маршрута."""
+        for index, rule in enumerate(self.limits[route]):
+            ident = await self._identity(rule, request)
+            if ident is None:
+                continue
+            try:
+                await self._acquire(route, index, rule, ident)
+            except RateLimitExceeded:
+                rate_limit_decisions.inc(route=route, result="denied")
+                raise
+        rate_limit_decisions.inc(route=route, result="allowed")
+
+limiter = HybridRateLimiter(redis_client, RATE_LIMITS)
+
+def rate_limit(route: str):
+    """Зависимость FastAPI, применяющая правила RATE_LIMITS[route]."""
+    if route not in RATE_LIMITS:
+        raise KeyError(f"No rate limits configured for route '{route}'")
+
+    async def dependency(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        try:
+            with span("limiter", route):
+                await limiter.check(route, request)
+        except RateLimitExceeded as e:
+            if e.unavailable:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Service temporarily unavailable, please try later",
+                )
+            raise HTTPException(
+                status_code=429,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+
+    return dependency
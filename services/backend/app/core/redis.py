@@ -1,14 +1,280 @@
+import asyncio
+import functools
+import socket
+import struct
 import redis.asyncio as redis
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from app.core import deadline
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
+from app.core.metrics import registry
+from app.core.redis_cache import ClientSideCache
+from app.core.tracing import span
 
-redis_client = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    db=settings.REDIS_DB,
-    password=settings.REDIS_PASSWORD,
-    ssl=settings.REDIS_SSL,
-    ssl_cert_reqs=None, # For managed services we often don't verify certs if it's internal or we don't have CA
-    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
-    socket_timeout=settings.REDIS_READ_TIMEOUT,
-    decode_responses=True,
+# Политики поведения при недоступности Redis (задаются для каждого места вызова)
+FAIL_OPEN = "fail_open"
+FAIL_CLOSED = "fail_closed"
+
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+    failure_exceptions=(RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError),
+)
+
+# Отдельный автомат для реплик: их недоступность не должна отключать запись в мастер
+replica_breaker = CircuitBreaker(
+    "redis_replica",
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+    failure_exceptions=(RedisConnectionError, RedisTimeoutError, OSError, asyncio.TimeoutError),
+)
+
+redis_degraded = registry.counter(
+    "redis_degraded_total",
+    "Redis failures handled by a call site's degraded policy",
+    ("site", "outcome"),
 )
+redis_batches = registry.counter(
+    "redis_batch_commands_total",
+    "Commands sent through request-scoped Redis batches, by pipeline size",
+    ("mode",),
+)
+
+class GuardedRedis(redis.Redis):
+    """Клиент Redis, все команды которого проходят через circuit breaker (по умолчанию redis_breaker).
+
+    Пока автомат открыт, команды сразу завершаются CircuitOpenError
+    вместо ожидания REDIS_READ_TIMEOUT на каждом запросе.
+    """
+    breaker = redis_breaker
+
+    async def execute_command(self, *args, **options):
+        # Истечение дедлайна запроса отменяет команду и не считается ошибкой Redis
+        with span("redis", str(args[0]) if args else ""):
+            async with deadline.bounded("redis"):
+                return await self.breaker.call(super().execute_command, *args, **options)
+
+class BlockingSentinelPool(SentinelConnectionPool, redis.BlockingConnectionPool):
+    """Пул Sentinel с тем же ограничением, что и в режиме одиночного Redis.
+
+    Не больше max_connections соединений; при исчерпании запрос ждёт не дольше
+    timeout (REDIS_POOL_TIMEOUT), а не открывает новые соединения без ограничения.
+    """
+
+class LocalReplicaFirstPool(BlockingSentinelPool):
+    """Пул соединений с репликами: сначала реплика на той же ноде, затем остальные реплики и мастер.
+
+    Адрес локальной реплики задаётся явно (local_address), остальные адреса
+    берутся из Sentinel; если локальная реплика недоступна, соединение
+    открывается со следующей по списку.
+    """
+    def __init__(self, service_name, sentinel_manager, local_address=None, **kwargs):
+        self.local_address = local_address
+        super().__init__(service_name, sentinel_manager, **kwargs)
+
+    async def rotate_slaves(self):
+        if self.local_address:
+            yield self.local_address
+        async for address in super().rotate_slaves():
+            if address != self.local_address:
+                yield address
+
+def fail_open_allowed(
+    site: str,
+    policy: str,
+    max_degraded_seconds: float | None = None,
+    breaker: CircuitBreaker = redis_breaker,
+) -> bool:
+    """Решает, можно ли продолжить без Redis в данном месте вызова.
+
+    fail_open разрешён не дольше max_degraded_seconds с начала текущей серии ошибок
+    автомата breaker — того, через который шёл неудавшийся вызов (replica_breaker
+    для чтения из реплики); после этого место вызова тоже начинает отказывать (fail closed).
+    """
+    allowed = policy == FAIL_OPEN and (
+        max_degraded_seconds is None
+        or breaker.degraded_seconds() <= max_degraded_seconds
+    )
+    redis_degraded.inc(site=site, outcome="open" if allowed else "closed")
+    return allowed
+
+def connection_kwargs(**overrides) -> dict:
+    """Параметры подключения к Redis, общие для пула и выделенных соединений."""
+    kwargs = dict(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_READ_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        decode_responses=True,
+    )
+    if settings.REDIS_SSL:
+        kwargs.update(
+            connection_class=redis.SSLConnection,
+            ssl_cert_reqs=None, # For managed services we often don't verify certs if it's internal or we don't have CA
+        )
+    kwargs.update(overrides)
+    return kwargs
+
+def _parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host, int(port)
+
+def default_gateway(route_table: str = "/proc/net/route") -> str | None:
+    """Шлюз маршрута по умолчанию. В задаче Swarm это адрес ноды в docker_gwbridge."""
+    try:
+        with open(route_table) as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[1] == "00000000":
+                    return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+    except (OSError, StopIteration, ValueError):
+        pass
+    return None
+
+def local_replica_host(value: str | None) -> str | None:
+    """REDIS_LOCAL_REPLICA_HOST: адрес, либо "gateway" — шлюз контейнера, т.е. сама нода."""
+    if value == "gateway":
+        return default_gateway()
+    return value or None
+
+if settings.REDIS_SENTINELS:
+    # Режим Sentinel: адрес мастера узнаём у Sentinel, при failover клиент переподключается сам
+    node_kwargs = connection_kwargs()
+    for key in ("host", "port", "connection_class"):
+        node_kwargs.pop(key, None)
+    if settings.REDIS_SSL:
+        node_kwargs["ssl"] = True
+
+    sentinel = Sentinel(
+        [_parse_address(address) for address in settings.REDIS_SENTINELS],
+        sentinel_kwargs={
+            "password": settings.REDIS_SENTINEL_PASSWORD,
+            "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT,
+            "socket_timeout": settings.REDIS_READ_TIMEOUT,
+        },
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        **node_kwargs,
+    )
+    redis_client = sentinel.master_for(
+        settings.REDIS_SENTINEL_MASTER,
+        redis_class=GuardedRedis,
+        connection_pool_class=BlockingSentinelPool,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+    )
+
+    if settings.REDIS_READ_FROM_REPLICAS:
+        local_replica = None
+        replica_host = local_replica_host(settings.REDIS_LOCAL_REPLICA_HOST)
+        if replica_host:
+            local_replica = (replica_host, settings.REDIS_LOCAL_REPLICA_PORT)
+        redis_read_client = sentinel.slave_for(
+            settings.REDIS_SENTINEL_MASTER,
+            redis_class=GuardedRedis,
+            connection_pool_class=LocalReplicaFirstPool,
+            local_address=local_replica,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+        )
+        redis_read_client.breaker = replica_breaker
+    else:
+        redis_read_client = redis_client
+
+    async def _master_address():
+        return await sentinel.discover_master(settings.REDIS_SENTINEL_MASTER)
+else:
+    sentinel = None
+    _master_address = None
+
+    # Явный пул: при исчерпании соединений запрос ждёт не дольше REDIS_POOL_TIMEOUT,
+    # а не открывает новые соединения без ограничения
+    redis_pool = redis.BlockingConnectionPool(
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        **connection_kwargs(),
+    )
+    redis_client = GuardedRedis.from_pool(redis_pool)
+    redis_read_client = redis_client
+
+# Клиентский кэш для читаемых часто ключей; запускается в lifespan, если включён.
+# Отслеживание ключей всегда идёт через мастер
+client_cache = ClientSideCache(
+    connection_kwargs(),
+    address_resolver=_master_address,
+    prefixes=settings.REDIS_CLIENT_CACHE_PREFIXES,
+    max_keys=settings.REDIS_CLIENT_CACHE_MAX_KEYS,
+    ttl=settings.REDIS_CLIENT_CACHE_TTL,
+)
+
+class RedisBatch:
+    """Команды Redis одного запроса, отправляемые одним pipeline.
+
+    Методы повторяют команды клиента (batch.exists(key), batch.get(key), ...)
+    и возвращают future. Команды, поставленные в очередь в пределах одного
+    тика цикла событий (например, через asyncio.gather), уходят в Redis
+    одним round trip; одиночная команда выполняется без pipeline.
+    """
+    def __init__(self, client: redis.Redis):
+        self._client = client
+        # Автомат клиента: по нему место вызова оценивает длительность деградации
+        self.breaker = getattr(client, "breaker", redis_breaker)
+        self._queue = []
+        self._flush_scheduled = False
+        self._tasks = set()
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return functools.partial(self._enqueue, name)
+
+    def _enqueue(self, name: str, *args, **kwargs) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((name, args, kwargs, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return future
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        commands, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._execute(commands))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, commands) -> None:
+        try:
+            if len(commands) == 1:
+                name, args, kwargs, _ = commands[0]
+                redis_batches.inc(mode="single")
+                results = [await getattr(self._client, name)(*args, **kwargs)]
+            else:
+                redis_batches.inc(len(commands), mode="pipelined")
+                async with self._client.pipeline(transaction=False) as pipe:
+                    for name, args, kwargs, _ in commands:
+                        getattr(pipe, name)(*args, **kwargs)
+                    with span("redis", "pipeline"):
+                        async with deadline.bounded("redis"):
+                            results = await self.breaker.call(pipe.execute, raise_on_error=False)
+        except Exception as e:
+            for *_, future in commands:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (*_, future), result in zip(commands, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+def get_redis_batch() -> RedisBatch:
+    """Зависимость FastAPI: один RedisBatch на запрос."""
+    return RedisBatch(redis_client)
@@ -0,0 +1,164 @@
+"""Клиентский кэш Redis с инвалидацией на стороне сервера (RESP3 CLIENT TRACKING).
+
+Воркер держит одно выделенное RESP3-соединение с включённым
+CLIENT TRACKING в режиме BCAST для заданных префиксов ключей: при любом
+изменении такого ключа сервер присылает push-сообщение invalidate,
+и ключ удаляется из локального кэша. Пока соединение не установлено
+или потеряно, кэш не используется и чтения идут напрямую в Redis.
+
+Подходит для читаемых часто и редко изменяемых ключей, например denylist:*.
+Включается настройкой REDIS_CLIENT_CACHE_ENABLED.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.logger import logger
+from app.core.metrics import registry
+
+client_cache_requests = registry.counter(
+    "redis_client_cache_requests_total",
+    "Client-side cache lookups by result (hit, miss, bypass)",
+    ("result",),
+)
+client_cache_invalidations = registry.counter(
+    "redis_client_cache_invalidations_total",
+    "Keys invalidated by server push messages (flush counts as one)",
+)
+
+class ClientSideCache:
+    def __init__(
+        self,
+        connection_kwargs: Dict[str, Any],
+        prefixes: Sequence[str],
+        address_resolver: Optional[Callable[[], Awaitable[Tuple[str, int]]]] = None,
+        max_keys: int = 10000,
+        ttl: float = 60.0,
+        ping_interval: float = 5.0,
+    ):
+        self._connection_kwargs = dict(connection_kwargs)
+        # В режиме Sentinel адрес мастера определяется заново при каждом подключении
+        self._address_resolver = address_resolver
+        self.prefixes = tuple(prefixes)
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.ping_interval = ping_interval
+        self._data: Dict[str, Tuple[Any, float]] = {}
+        # Растёт при каждой инвалидации: чтение, во время которого пришла инвалидация, не кэшируется
+        self._generation = 0
+        self._ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._set_ready(False)
+
+    def _set_ready(self, ready: bool) -> None:
+        self._ready = ready
+        self.clear()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._generation += 1
+
+    def _tracked(self, key: str) -> bool:
+        return key.startswith(self.prefixes)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if not self._ready or not self._tracked(key):
+            client_cache_requests.inc(result="bypass")
+            return await loader()
+
+        entry = self._data.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            client_cache_requests.inc(result="hit")
+            return entry[0]
+
+        client_cache_requests.inc(result="miss")
+        generation = self._generation
+        value = await loader()
+        if self._ready and generation == self._generation:
+            if len(self._data) >= self.max_keys:
+                # Вытесняем самый старый ключ (dict хранит порядок вставки)
+                self._data.pop(next(iter(self._data)), None)
+            self._data[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    async def _on_invalidate(self, response):
+        # ["invalidate", [key, ...]] или ["invalidate", None] при FLUSHDB/FLUSHALL
+        keys = response[1] if len(response) > 1 else None
+        self._generation += 1
+        client_cache_invalidations.inc(len(keys) if keys else 1)
+        if keys is None:
+            self._data.clear()
+        else:
+            for key in keys:
+                if isinstance(key, bytes):
+                    key = key.decode()
+                self._data.pop(key, None)
+        return response
+
+    async def _connect(self) -> redis.Connection:
+        kwargs = dict(self._connection_kwargs)
+        connection_class = kwargs.pop("connection_class", redis.Connection)
+        kwargs.pop("health_check_interval", None)
+        if self._address_resolver is not None:
+            kwargs["host"], kwargs["port"] = await self._address_resolver()
+        conn = connection_class(protocol=3, **kwargs)
+        await conn.connect()
+        conn._parser.set_invalidation_push_handler(self._on_invalidate)
+        args = ["CLIENT", "TRACKING", "ON", "BCAST"]
+        for prefix in self.prefixes:
+            args += ["PREFIX", prefix]
+        await conn.send_command(*args)
+        await conn.read_response()
+        return conn
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            conn = None
+            try:
+                conn = await self._connect()
+                self._set_ready(True)
+                logger.info(f"Redis client-side cache enabled for prefixes: {', '.join(self.prefixes)}")
+                backoff = 0.5
+                awaiting_pong = False
+                while True:
+                    response = await conn.read_response(timeout=self.ping_interval, push_request=True)
+                    if response is not None:
+                        awaiting_pong = False
+                        continue
+                    if awaiting_pong:
+                        raise RedisConnectionError("tracking connection did not answer PING")
+                    # Тишина на соединении: проверяем, что оно живо (PONG придёт следующим чтением)
+                    await conn.send_command("PING")
+                    awaiting_pong = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._ready:
+                    logger.warning(f"Redis client-side cache disabled, tracking connection lost: {e}")
+                self._set_ready(False)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if conn is not None:
+                    await conn.disconnect()
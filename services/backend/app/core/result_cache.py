@@ -0,0 +1,77 @@
+"""Кэш готовых ответов в Redis с инвалидацией через метки версий.
+
+Ключ включает метку версии данных (app/core/versions.py) и нормализованные
+параметры запроса: после записи метка меняется, и следующие запросы читают
+уже другие ключи. Старые ключи не удаляются и не ищутся через SCAN — они
+просто истекают по TTL.
+
+Значения — готовые байты ответа, поэтому попадание в кэш не требует ни
+запросов в Postgres, ни сериализации. Чтение идёт через клиент для чтения
+(реплику, если настроена): отставшая реплика даёт промах, а не старые данные,
+так как ключа с новой меткой на ней ещё нет. Ошибки Redis считаются промахом.
+
+Перед Redis проверяется общий кэш воркеров в разделяемой памяти (local):
+значения по версионированным ключам не меняются, поэтому копия в нём не
+требует инвалидации.
+"""
+import hashlib
+from typing import Optional
+
+from app.core.deadline import DeadlineExceeded
+from app.core.logger import logger
+from app.core.metrics import registry
+from app.core.shm_cache import SharedMemoryCache
+
+result_cache_requests = registry.counter(
+    "result_cache_requests_total",
+    "Result cache lookups by result (local_hit, hit, miss, error)",
+    ("cache", "result"),
+)
+
+class ResultCache:
+    def __init__(
+        self,
+        name: str,
+        client,
+        read_client=None,
+        ttl: int = 300,
+        local: Optional[SharedMemoryCache] = None,
+    ):
+        self.name = name
+        self._client = client
+        self._read_client = read_client or client
+        self.ttl = ttl
+        self.local = local
+
+    def key(self, stamp: str, *params) -> str:
+        digest = hashlib.sha1("|".join(str(param) for param in params).encode()).hexdigest()
+        return f"cache:{self.name}:{stamp}:{digest}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                result_cache_requests.inc(cache=self.name, result="local_hit")
+                return value
+        try:
+            value = await self._read_client.get(key)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            result_cache_requests.inc(cache=self.name, result="error")
+            logger.warning(f"Result cache {self.name} read failed: {e}")
+            return None
+        result_cache_requests.inc(cache=self.name, result="hit" if value is not None else "miss")
+        if value is not None and self.local is not None:
+            self.local.set(key, value, self.ttl)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        if self.local is not None:
+            self.local.set(key, value, self.ttl)
+        try:
+            await self._client.set(key, value, ex=self.ttl)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Result cache {self.name} write failed: {e}")
@@ -0,0 +1,102 @@
+"""Параметры воркеров gunicorn от ресурсов контейнера и перезапуск разросшихся воркеров.
+
+cpu_limit() — доступные контейнеру CPU: квота cgroup (v2 cpu.max или
+v1 cpu.cfs_quota_us/cpu.cfs_period_us), иначе число CPU из affinity процесса.
+По ней gunicorn.conf.py выбирает число воркеров.
+
+MemoryWatchdog — фоновая задача воркера: если его уникальная память (USS)
+превысила WORKER_MAX_USS_MB, воркер отправляет себе SIGTERM. RSS для этого
+не годится: в него входят страницы, общие с мастером после preload, и он
+растёт у всех воркеров одновременно, хотя сама память не удваивается. uvicorn перестаёт
+принимать соединения, завершает начатые запросы и lifespan, а мастер
+gunicorn запускает вместо него новый воркер. Первая проверка сдвинута на
+случайную долю интервала, чтобы воркеры не перезапускались одновременно.
+Перезапуск по числу запросов (max_requests с разбросом) делает сам gunicorn.
+"""
+import asyncio
+import math
+import os
+import random
+import signal
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.memory import memory_usage
+from app.core.metrics import registry
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+worker_recycles = registry.counter(
+    "worker_recycles_total",
+    "Workers that asked to be restarted, by reason",
+    ("reason",),
+)
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def cgroup_cpu_quota(root: str = CGROUP_ROOT) -> Optional[float]:
+    """Квота CPU контейнера (например, 1.5) или None, если квоты нет."""
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us")) or _read(os.path.join(root, "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us")) or _read(os.path.join(root, "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+def cpu_limit(root: str = CGROUP_ROOT) -> float:
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = cgroup_cpu_quota(root)
+    return min(quota, available) if quota is not None else float(available)
+
+def worker_count(per_cpu: float = 1.0, minimum: int = 2, maximum: int = 8, root: str = CGROUP_ROOT) -> int:
+    """Воркеров uvicorn на контейнер: по одному на CPU (асинхронным воркерам больше не нужно)."""
+    return max(minimum, min(maximum, math.ceil(cpu_limit(root) * per_cpu)))
+
+class MemoryWatchdog:
+    def __init__(self, max_uss_bytes: int, interval: float = 30.0):
+        self.max_uss_bytes = max_uss_bytes
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.max_uss_bytes > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def check(self) -> bool:
+        """True, если воркер превысил порог и попросил о перезапуске."""
+        uss = memory_usage().get("uss", 0)
+        if uss <= self.max_uss_bytes:
+            return False
+        logger.warning(
+            f"Worker USS {uss / 2**20:.0f} MiB exceeds {self.max_uss_bytes / 2**20:.0f} MiB, restarting gracefully"
+        )
+        worker_recycles.inc(reason="memory")
+        os.kill(os.getpid(), signal.SIGTERM)
+        return True
+
+    async def _run(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while not self.check():
+            await asyncio.sleep(self.interval)
+
+memory_watchdog = MemoryWatchdog(settings.WORKER_MAX_USS_MB * 2**20, settings.WORKER_MEMORY_CHECK_INTERVAL)
@@ -4,6 +4,7 @@ from typing import Any, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.tracing import span
 
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 
@@ -20,9 +21,10 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
         "iat": int(datetime.now(timezone.utc).timestamp()),
         "nbf": int(datetime.now(timezone.utc).timestamp())
     }
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    with span("jwt", "encode"):
+        encoded_jwt = jwt.encode(
+            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
     return encoded_jwt
 
 def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
@@ -40,13 +42,21 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: timedelta = No
         "jti": jti,
         "iat": int(datetime.now(timezone.utc).timestamp())
     }
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    with span("jwt", "encode"):
+        encoded_jwt = jwt.encode(
+            to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
     return encoded_jwt
 
+def decode_token(token: str) -> dict:
+    """Проверяет подпись и срок токена; исключения jose (JWTError, ExpiredSignatureError) не перехватываются."""
+    with span("jwt", "decode"):
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with span("hash", "verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with span("hash", "hash"):
+        return pwd_context.hash(password)
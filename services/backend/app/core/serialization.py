@@ -0,0 +1,42 @@
+"""Быстрая сериализация ответов в JSON.
+
+Ответ сериализуется сразу в байты кэшированным TypeAdapter (pydantic-core):
+без промежуточных dict, jsonable_encoder и json.dumps, через которые проходит
+обычный путь FastAPI с response_model. Данные, уже имеющие нужный тип
+(модели pydantic), сериализуются напрямую; строки БД и ORM-объекты
+валидируются из атрибутов (from_attributes=True) в модель схемы, так что
+в ответ попадают только поля схемы.
+
+response_model у маршрута остаётся для документации: возвращённый Response
+FastAPI отдаёт как есть.
+"""
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+def dump_json(type_: Any, value: Any, *, from_attributes: bool = False) -> bytes:
+    type_adapter = adapter(type_)
+    if from_attributes:
+        value = type_adapter.validate_python(value, from_attributes=True)
+    return type_adapter.dump_json(value)
+
+def json_response(
+    type_: Any,
+    value: Any,
+    *,
+    from_attributes: bool = False,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    return Response(
+        dump_json(type_, value, from_attributes=from_attributes),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
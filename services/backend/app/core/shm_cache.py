@@ -0,0 +1,173 @@
+"""Общий для воркеров gunicorn кэш в разделяемой памяти (mmap-файл в /dev/shm).
+
+Уровень между кэшами процесса и Redis: воркеры одного контейнера видят одни
+и те же записи, поэтому значение, полученное одним воркером из Redis или
+Postgres, остальным уже не нужно загружать. Хранить можно только то, что не
+требует явной инвалидации: значения с меткой версии в ключе (app/core/versions.py)
+или с коротким TTL.
+
+Таблица фиксированного размера: SHM_CACHE_SLOTS ячеек по SHM_CACHE_SLOT_SIZE
+байт, ячейка выбирается по хешу ключа, новая запись вытесняет старую.
+Чтение без блокировок (seqlock): писатель делает счётчик ячейки нечётным на
+время записи, читатель сравнивает счётчик до и после копирования и проверяет
+CRC значения; при гонке чтение считается промахом. Запись в ячейку
+сериализуется между процессами блокировкой fcntl на её диапазон байт.
+Срок жизни считается по time.monotonic(), общему для процессов одной машины.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import registry
+
+MAGIC = b"FSSHM001"
+FILE_HEADER = struct.Struct("<8sII")
+FILE_HEADER_SIZE = 64
+# seq, хеш ключа, момент истечения, длина ключа, длина значения, CRC значения
+SLOT_HEADER = struct.Struct("<QQdIII4x")
+SEQ = struct.Struct("<Q")
+
+shm_cache_requests = registry.counter(
+    "shm_cache_requests_total",
+    "Shared-memory cache operations by result (hit, miss, store, oversize)",
+    ("result",),
+)
+
+def _key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+class SharedMemoryCache:
+    def __init__(self, path: str, slots: int = 1024, slot_size: int = 16384):
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._mm is not None
+
+    @property
+    def max_item_size(self) -> int:
+        return self.slot_size - SLOT_HEADER.size
+
+    def open(self) -> None:
+        """Открывает (или создаёт) файл таблицы. Вызывается в каждом воркере при старте."""
+        if self._mm is not None:
+            return
+        size = FILE_HEADER_SIZE + self.slots * self.slot_size
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            logger.warning(f"Shared-memory cache disabled, cannot open {self.path}: {e}")
+            return
+        try:
+            # Разметку проверяет и при необходимости создаёт один процесс за раз
+            fcntl.lockf(fd, fcntl.LOCK_EX, FILE_HEADER_SIZE, 0)
+            try:
+                header = os.pread(fd, FILE_HEADER.size, 0)
+                if len(header) < FILE_HEADER.size or FILE_HEADER.unpack(header) != (MAGIC, self.slots, self.slot_size):
+                    # Новый файл или другая разметка (изменились настройки): таблица обнуляется
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, FILE_HEADER.pack(MAGIC, self.slots, self.slot_size), 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, FILE_HEADER_SIZE, 0)
+            self._mm = mmap.mmap(fd, size)
+            self._fd = fd
+        except OSError as e:
+            os.close(fd)
+            logger.warning(f"Shared-memory cache disabled, cannot map {self.path}: {e}")
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _offset(self, key_hash: int) -> int:
+        return FILE_HEADER_SIZE + (key_hash % self.slots) * self.slot_size
+
+    def get(self, key: str) -> Optional[bytes]:
+        mm = self._mm
+        if mm is None:
+            return None
+        raw_key = key.encode()
+        key_hash = _key_hash(raw_key)
+        offset = self._offset(key_hash)
+
+        seq, stored_hash, expires, key_len, value_len, crc = SLOT_HEADER.unpack_from(mm, offset)
+        if seq & 1 or stored_hash != key_hash or expires < time.monotonic():
+            shm_cache_requests.inc(result="miss")
+            return None
+        start = offset + SLOT_HEADER.size
+        data = mm[start:start + min(key_len + value_len, self.max_item_size)]
+        # Ячейку перезаписали во время копирования — считаем промахом
+        if SEQ.unpack_from(mm, offset)[0] != seq or data[:key_len] != raw_key:
+            shm_cache_requests.inc(result="miss")
+            return None
+        value = data[key_len:]
+        if len(value) != value_len or zlib.crc32(value) != crc:
+            shm_cache_requests.inc(result="miss")
+            return None
+        shm_cache_requests.inc(result="hit")
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> bool:
+        mm = self._mm
+        if mm is None:
+            return False
+        raw_key = key.encode()
+        if len(raw_key) + len(value) > self.max_item_size:
+            shm_cache_requests.inc(result="oversize")
+            return False
+        key_hash = _key_hash(raw_key)
+        offset = self._offset(key_hash)
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            # Нечётный счётчик остаётся и после писателя, упавшего посреди записи: | 1 это учитывает
+            seq = SEQ.unpack_from(mm, offset)[0] | 1
+            SEQ.pack_into(mm, offset, seq)
+            start = offset + SLOT_HEADER.size
+            mm[start:start + len(raw_key)] = raw_key
+            mm[start + len(raw_key):start + len(raw_key) + len(value)] = value
+            SLOT_HEADER.pack_into(
+                mm, offset, seq, key_hash, time.monotonic() + ttl, len(raw_key), len(value), zlib.crc32(value)
+            )
+            SEQ.pack_into(mm, offset, seq + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+        shm_cache_requests.inc(result="store")
+        return True
+
+    def delete(self, key: str) -> None:
+        mm = self._mm
+        if mm is None:
+            return
+        raw_key = key.encode()
+        key_hash = _key_hash(raw_key)
+        offset = self._offset(key_hash)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            seq, stored_hash = struct.unpack_from("<QQ", mm, offset)
+            if stored_hash == key_hash:
+                # Истёкшая запись читателем не возвращается
+                SEQ.pack_into(mm, offset, seq | 1)
+                struct.pack_into("<d", mm, offset + 16, 0.0)
+                SEQ.pack_into(mm, offset, (seq | 1) + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+# Открывается в lifespan каждого воркера, если включён SHM_CACHE_ENABLED
+shared_cache = SharedMemoryCache(settings.SHM_CACHE_PATH, settings.SHM_CACHE_SLOTS, settings.SHM_CACHE_SLOT_SIZE)
@@ -0,0 +1,78 @@
+"""Объединение одновременных одинаковых асинхронных запросов (singleflight).
+
+Если несколько корутин воркера одновременно запрашивают одно и то же
+(например, пользователя по id при 10 параллельных запросах с одним токеном),
+выполняется только первый вызов, а остальные ждут его результат.
+
+- Ошибка ведущего вызова пробрасывается всем ожидающим.
+- Отмена одного из ожидающих не отменяет общий вызов, пока его ждёт кто-то ещё;
+  когда ожидающих не осталось, общий вызов отменяется.
+- Результат не кэшируется: ключ освобождается сразу после завершения вызова.
+- Общий вызов выполняется в пустом контексте: дедлайн и трасса первого
+  вызвавшего к нему не относятся. Каждый ожидающий ограничен своим дедлайном
+  запроса (bounded("request") в main.py), общий вызов — таймаутами пулов.
+"""
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import registry
+
+singleflight_calls = registry.counter(
+    "singleflight_calls_total",
+    "Calls that went through singleflight groups",
+    ("group",),
+)
+singleflight_merged = registry.counter(
+    "singleflight_merged_total",
+    "Calls merged into an already in-flight identical call",
+    ("group",),
+)
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        singleflight_calls.inc(group=self.name)
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.get_running_loop().create_task(fn(), context=contextvars.Context())
+            flight = _Flight(task)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._forget(key, flight))
+        else:
+            singleflight_merged.inc(group=self.name)
+
+        flight.waiters += 1
+        try:
+            # shield: отмена одного ожидающего не должна отменять общий вызов
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Новые вызовы с тем же ключом не должны присоединиться к отменяемому
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Исключение уже передано ожидающим; помечаем его как полученное,
+        # чтобы asyncio не логировал "exception was never retrieved"
+        if not flight.task.cancelled():
+            flight.task.exception()
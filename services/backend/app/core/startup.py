@@ -0,0 +1,82 @@
+"""Прогрев воркера перед приёмом трафика и профилирование запуска.
+
+Первые запросы нового воркера платят за открытие соединений с Postgres
+и Redis, подготовку выражений и загрузку бэкенда Argon2. warm_up()
+делает это в lifespan — до того, как воркер начнёт принимать соединения и
+/api/ready станет зелёным. Каждый шаг ограничен STARTUP_WARMUP_TIMEOUT;
+ошибки прогрева не мешают запуску (воркер просто стартует «холодным»).
+
+При STARTUP_PROFILE=True в журнал выводится время импорта app.main и
+каждого этапа запуска. Время импорта по модулям: python -m benchmarks.startup_profile.
+"""
+import asyncio
+import contextlib
+import time
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.core.logger import logger
+
+class StartupProfiler:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases.append((name, seconds))
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        lines = ["Startup profile:"]
+        lines += [f"  {name:<32} {seconds * 1000:9.1f} ms" for name, seconds in self.phases]
+        return "\n".join(lines)
+
+startup_profiler = StartupProfiler(settings.STARTUP_PROFILE)
+
+async def _warm_database() -> None:
+    from app.db import queries
+    from app.db.session import AsyncSessionLocal, engine
+
+    count = min(settings.STARTUP_WARM_DB_CONNECTIONS, engine.pool.size())
+
+    async def open_connection():
+        async with AsyncSessionLocal() as db:
+            await queries.prepare_hot_statements(db)
+
+    # Одновременно открытые сессии занимают разные соединения пула; после прогрева они остаются в пуле
+    await asyncio.gather(*(open_connection() for _ in range(count)))
+
+async def _warm_redis() -> None:
+    from app.core.ratelimit import limiter
+    from app.core.redis import redis_client, redis_read_client
+
+    count = settings.STARTUP_WARM_REDIS_CONNECTIONS
+    clients = {id(redis_client): redis_client, id(redis_read_client): redis_read_client}.values()
+    await asyncio.gather(*(client.ping() for client in clients for _ in range(count)))
+    await limiter.warm_up()
+
+def _warm_password_hashing() -> None:
+    from app.core.security import pwd_context
+    pwd_context.handler("argon2").get_backend()
+
+async def _run_step(name: str, step) -> None:
+    with startup_profiler.phase(f"warm_up.{name}"):
+        try:
+            await asyncio.wait_for(step(), settings.STARTUP_WARMUP_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Startup warm-up of {name} failed: {e or type(e).__name__}")
+
+async def warm_up() -> None:
+    with startup_profiler.phase("warm_up.password_hashing"):
+        _warm_password_hashing()
+    await asyncio.gather(
+        _run_step("database", _warm_database),
+        _run_step("redis", _warm_redis),
+    )
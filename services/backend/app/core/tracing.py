@@ -0,0 +1,220 @@
+"""Трассировка запросов внутри воркера: из чего сложилось время ответа.
+
+Middleware заводит на запрос объект Trace в contextvar; span() вокруг
+дорогих операций записывает в него интервалы по категориям: db (запросы
+SQLAlchemy), redis (команды и pipeline), hash (Argon2/bcrypt), jwt
+(подпись и проверка токенов), limiter (rate limit и защита входа). Вне
+запроса span() ничего не делает, поэтому инструментированный код можно
+вызывать откуда угодно.
+
+Что получается на выходе:
+- заголовок Server-Timing (суммы по категориям и total) — виден во
+  вкладке Network браузера. По умолчанию выключен (SERVER_TIMING_ENABLED):
+  разбивка видна любому клиенту, а на маршрутах аутентификации категория
+  hash не отдаётся никогда — по ней видно, существует ли аккаунт;
+- разбивка по категориям в строке журнала запроса, если он дольше
+  TRACE_SLOW_THRESHOLD;
+- трассы медленных запросов и доля TRACE_SAMPLE_RATE остальных — JSON
+  по строке в TRACE_EXPORT_PATH (откуда их забирает сборщик логов:
+  Promtail, Vector, filelog receiver OpenTelemetry Collector). Запись в
+  файл идёт в отдельном потоке, не в цикле событий.
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.metrics import registry
+
+# Интервалов в одной трассе не больше; остальные учитываются только в суммах
+MAX_SPANS = 200
+# Категории, скрытые из Server-Timing по префиксу пути
+HIDDEN_CATEGORIES = (
+    ("/api/auth/", ("hash",)),
+)
+
+traces_exported = registry.counter(
+    "traces_exported_total",
+    "Request traces written to the export file, by reason (slow, sampled, dropped)",
+    ("reason",),
+)
+
+class Trace:
+    __slots__ = ("trace_id", "started", "wall_started", "spans", "totals", "counts")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.spans: List[tuple] = []
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, category: str, name: str, started: float, duration: float) -> None:
+        self.totals[category] = self.totals.get(category, 0.0) + duration
+        self.counts[category] = self.counts.get(category, 0) + 1
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((category, name, started - self.started, duration))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, hidden=()) -> str:
+        """Значение заголовка Server-Timing: суммы по категориям в миллисекундах (кроме hidden)."""
+        parts = [
+            f'{category};dur={total * 1000:.2f};desc="{self.counts[category]}x"'
+            for category, total in self.totals.items()
+            if category not in hidden
+        ]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+    def summary(self) -> str:
+        """Разбивка для журнала: "db=12.3ms/2 hash=45.0ms/1"."""
+        return " ".join(
+            f"{category}={total * 1000:.1f}ms/{self.counts[category]}" for category, total in self.totals.items()
+        ) or "no spans"
+
+    def to_dict(self, **fields) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "start": self.wall_started,
+            "duration_ms": round(self.elapsed() * 1000, 3),
+            "worker": os.getpid(),
+            **fields,
+            "totals_ms": {category: round(total * 1000, 3) for category, total in self.totals.items()},
+            "spans": [
+                {"category": category, "name": name, "start_ms": round(start * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+                for category, name, start, duration in self.spans
+            ],
+        }
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("request_trace", default=None)
+
+def hidden_categories(path: str) -> tuple:
+    """Категории, которые нельзя отдавать в Server-Timing ответа на path."""
+    for prefix, categories in HIDDEN_CATEGORIES:
+        if path.startswith(prefix):
+            return categories
+    return ()
+
+def current() -> Optional[Trace]:
+    return _trace.get()
+
+def start_trace():
+    return _trace.set(Trace())
+
+def end_trace(token) -> None:
+    _trace.reset(token)
+
+class span:
+    """Интервал категории category внутри текущего запроса: with span("db", "SELECT"): ..."""
+    __slots__ = ("category", "name", "trace", "started")
+
+    def __init__(self, category: str, name: str = ""):
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _trace.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.category, self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+def record(category: str, name: str, started: float) -> None:
+    """Записывает интервал, начатый в started (perf_counter), — для кода с событиями начала и конца."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(category, name, started, time.perf_counter() - started)
+
+def instrument_engine(engine) -> None:
+    """Интервалы db для каждого запроса SQLAlchemy (события выполняются в контексте запроса)."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["trace_started"].pop()
+        record("db", statement.split(None, 1)[0].upper() if statement else "", started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("trace_started") if context.connection is not None else None
+        if stack:
+            record("db", "error", stack.pop())
+
+class TraceExporter:
+    """Пишет трассы JSON-строками в файл из фонового потока; при переполнении очереди трассы отбрасываются."""
+
+    def __init__(self, path: str, max_queue: int = 1000):
+        self.path = path
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, data: dict, reason: str) -> None:
+        if not self.path:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(json.dumps(data, separators=(",", ":")))
+            traces_exported.inc(reason=reason)
+        except queue.Full:
+            traces_exported.inc(reason="dropped")
+
+    def _write(self) -> None:
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+            lines = [line]
+            while not self._queue.empty() and len(lines) < 100:
+                item = self._queue.get_nowait()
+                if item is None:
+                    self._append(lines)
+                    return
+                lines.append(item)
+            self._append(lines)
+
+    def _append(self, lines: List[str]) -> None:
+        try:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"Cannot write traces to {self.path}: {e}")
+
+    def close(self, timeout: float = 1.0) -> None:
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+
+exporter = TraceExporter(settings.TRACE_EXPORT_PATH)
+
+def finish(trace: Trace, slow: bool, **fields) -> None:
+    """Экспортирует трассу медленного запроса или попавшего в выборку."""
+    if slow:
+        exporter.submit(trace.to_dict(**fields), "slow")
+    elif settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE:
+        exporter.submit(trace.to_dict(**fields), "sampled")
@@ -0,0 +1,127 @@
+"""Версии данных в Redis для условных запросов (ETag / If-None-Match).
+
+Каждая область данных (профиль пользователя user:<id>, список пользователей
+users) имеет в Redis случайную метку версии. Запись меняет метку после
+commit, поэтому ETag, собранный из меток, меняется вместе с данными, и
+совпадение If-None-Match можно проверить, не читая и не сериализуя сами
+данные. Проверка доступа (пользователь, его статус и роль) выполняется
+раньше: 304 получает только тот, кому отдали бы и 200 (RFC 9110, 13.2.1).
+
+Метка читается до данных: запись, пришедшая между чтением метки и чтением
+данных, даёт ETag со старой меткой, который при следующем запросе просто не
+совпадёт. Метки — случайные значения, а не счётчики: после потери ключа в
+Redis новая метка не повторит уже выданную. Ключи живут ETAG_VERSION_TTL,
+это ограничивает устаревание, если смена метки не дошла до Redis.
+Метки читаются с мастера: реплика может отставать от записи. Вместо
+клиента можно передать RedisBatch запроса (client=...), тогда чтение меток
+уходит в Redis одним pipeline с другими командами запроса.
+"""
+import hashlib
+import secrets
+from typing import Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.core.logger import logger
+from app.core.metrics import registry
+from app.core.redis import redis_client
+from app.core.tracing import span
+
+USERS = "users"
+
+conditional_requests = registry.counter(
+    "conditional_requests_total",
+    "Conditional GET handling by result (not_modified, modified, bypass)",
+    ("route", "result"),
+)
+version_bump_errors = registry.counter(
+    "version_bump_errors_total",
+    "Failed version stamp updates (cached representations may stay valid until the stamp expires)",
+)
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def _new_stamp() -> str:
+    return secrets.token_hex(8)
+
+class VersionStamps:
+    def __init__(self, client, prefix: str = "version:"):
+        self._client = client
+        self.prefix = prefix
+
+    async def get(self, *scopes: str, client=None) -> Tuple[str, ...]:
+        client = client or self._client
+        keys = [self.prefix + scope for scope in scopes]
+        values = await client.mget(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if missing:
+            # SET NX: параллельные запросы сходятся на одной метке
+            for key in missing:
+                await client.set(key, _new_stamp(), ex=settings.ETAG_VERSION_TTL, nx=True)
+            values = await client.mget(keys)
+        return tuple(value.decode() if isinstance(value, bytes) else str(value) for value in values)
+
+    async def bump(self, *scopes: str) -> None:
+        """Меняет метки после commit. Ошибка Redis не отменяет уже выполненную запись."""
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.set(self.prefix + scope, _new_stamp(), ex=settings.ETAG_VERSION_TTL)
+                with span("redis", "pipeline"):
+                    await pipe.execute()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            version_bump_errors.inc()
+            logger.error(f"Failed to bump versions {scopes}: {e}")
+
+    async def try_get(self, *scopes: str, client=None) -> Optional[Tuple[str, ...]]:
+        """Метки scopes или None, если Redis недоступен (условная обработка и кэш пропускаются)."""
+        try:
+            return await self.get(*scopes, client=client)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Version stamps unavailable, conditional request skipped: {e}")
+            return None
+
+    async def etag(self, scopes: Sequence[str], *parts, client=None) -> Optional[str]:
+        """Сильный ETag из меток scopes и параметров представления; None, если Redis недоступен."""
+        stamps = await self.try_get(*scopes, client=client)
+        return make_etag(scopes, stamps, *parts) if stamps is not None else None
+
+def make_etag(scopes: Sequence[str], stamps: Sequence[str], *parts) -> str:
+    material = "|".join([*scopes, *stamps, *(str(part) for part in parts)])
+    return f'"{hashlib.sha256(material.encode()).hexdigest()[:32]}"'
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Слабое сравнение, как требует RFC 9110 для If-None-Match: сжатие делает ETag слабым (W/)."""
+    header = request.headers.get("if-none-match")
+    if not etag or not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def etag_headers(etag: Optional[str]) -> dict:
+    # private: ответы зависят от пользователя; no-cache: клиент всегда переспрашивает с If-None-Match
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+def not_modified(route: str, request: Request, etag: Optional[str]) -> Optional[Response]:
+    """Ответ 304, если ETag клиента совпал с текущим, иначе None (и учёт результата в метриках)."""
+    if etag is None:
+        conditional_requests.inc(route=route, result="bypass")
+        return None
+    if etag_matches(request, etag):
+        conditional_requests.inc(route=route, result="not_modified")
+        return Response(status_code=304, headers=etag_headers(etag))
+    conditional_requests.inc(route=route, result="modified")
+    return None
+
+versions = VersionStamps(redis_client)
@@ -0,0 +1,143 @@
+"""Быстрый путь для горячих запросов аутентификации.
+
+Запросы пользователя по id (с ролью) и по email выполняются миллионы раз в день,
+поэтому они обходят компиляцию ORM, selectinload и identity map: SQL заранее
+подготавливается на asyncpg-соединении текущей сессии (один раз на соединение),
+а результат возвращается в виде лёгких объектов UserRow/RoleRow.
+
+Объекты совместимы по атрибутам с моделями User/Role (их можно валидировать
+через схемы с from_attributes), но не привязаны к сессии — для изменения
+пользователя нужно загрузить ORM-модель.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from asyncpg.exceptions import InvalidCachedStatementError
+
+from app.core import deadline
+
+@dataclass(slots=True)
+class RoleRow:
+    id: int
+    name: str
+    description: Optional[str] = None
+
+@dataclass(slots=True)
+class UserRow:
+    id: int
+    username: str
+    email: str
+    hashed_password: str
+    role_id: Optional[int]
+    is_active: Optional[bool]
+    role_obj: Optional[RoleRow] = None
+
+    def role_name(self):
+        if self.role_obj:
+            return self.role_obj.name
+        return "No Role"
+
+    # Тот же формат, что и User.serialization()
+    def serialization(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "email": self.email,
+            "role_name": self.role_name(),
+            "role_id": self.role_id,
+            "is_active": self.is_active
+        }
+
+_USER_COLUMNS = "u.id, u.username, u.email, u.hashed_password, u.role_id, u.is_active"
+
+USER_WITH_ROLE_BY_ID = (
+    f"SELECT {_USER_COLUMNS}, r.name AS role_name, r.description AS role_description "
+    "FROM users u LEFT JOIN roles r ON r.id = u.role_id WHERE u.id = $1"
+)
+USER_BY_ID = f"SELECT {_USER_COLUMNS} FROM users u WHERE u.id = $1"
+USER_BY_EMAIL = f"SELECT {_USER_COLUMNS} FROM users u WHERE u.email = $1"
+
+HOT_STATEMENTS = (USER_WITH_ROLE_BY_ID, USER_BY_ID, USER_BY_EMAIL)
+
+# Подготовленные выражения живут столько же, сколько asyncpg-соединение из пула
+_prepared: "WeakKeyDictionary[Any, Dict[str, Any]]" = WeakKeyDictionary()
+
+async def _driver_connection(db: AsyncSession):
+    # Берём то же соединение (и ту же транзакцию), что использует сессия
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    return raw.driver_connection
+
+async def _fetchrow(db: AsyncSession, sql: str, *args):
+    # Оставшийся бюджет запроса — timeout asyncpg (при истечении запрос отменяется и на сервере)
+    timeout = deadline.remaining()
+    if timeout is not None:
+        deadline.check("postgres")
+    try:
+        return await _fetchrow_prepared(db, sql, *args, timeout=timeout)
+    except asyncio.TimeoutError:
+        if timeout is None:
+            raise
+        deadline.deadline_exceeded.inc(stage="postgres")
+        raise deadline.DeadlineExceeded("postgres") from None
+
+def _statements(driver) -> Dict[str, Any]:
+    statements = _prepared.get(driver)
+    if statements is None:
+        statements = _prepared[driver] = {}
+    return statements
+
+async def prepare_hot_statements(db: AsyncSession) -> None:
+    """Подготавливает горячие запросы на соединении сессии заранее (прогрев воркера при старте)."""
+    driver = await _driver_connection(db)
+    statements = _statements(driver)
+    for sql in HOT_STATEMENTS:
+        if sql not in statements:
+            statements[sql] = await driver.prepare(sql)
+
+async def _fetchrow_prepared(db: AsyncSession, sql: str, *args, timeout: Optional[float] = None):
+    driver = await _driver_connection(db)
+    statements = _statements(driver)
+
+    stmt = statements.get(sql)
+    if stmt is None:
+        stmt = statements[sql] = await driver.prepare(sql, timeout=timeout)
+    try:
+        return await stmt.fetchrow(*args, timeout=timeout)
+    except InvalidCachedStatementError:
+        # Схема изменилась (миграция) — переподготавливаем один раз
+        stmt = statements[sql] = await driver.prepare(sql, timeout=timeout)
+        return await stmt.fetchrow(*args, timeout=timeout)
+
+def _user_from_record(record, with_role: bool = False) -> UserRow:
+    role = None
+    if with_role and record["role_name"] is not None:
+        role = RoleRow(
+            id=record["role_id"],
+            name=record["role_name"],
+            description=record["role_description"],
+        )
+    return UserRow(
+        id=record["id"],
+        username=record["username"],
+        email=record["email"],
+        hashed_password=record["hashed_password"],
+        role_id=record["role_id"],
+        is_active=record["is_active"],
+        role_obj=role,
+    )
+
+async def get_user_with_role_by_id(db: AsyncSession, user_id: int) -> Optional[UserRow]:
+    record = await _fetchrow(db, USER_WITH_ROLE_BY_ID, user_id)
+    return _user_from_record(record, with_role=True) if record else None
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[UserRow]:
+    record = await _fetchrow(db, USER_BY_ID, user_id)
+    return _user_from_record(record) if record else None
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserRow]:
+    record = await _fetchrow(db, USER_BY_EMAIL, email)
+    return _user_from_record(record) if record else None
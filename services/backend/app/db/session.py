@@ -4,6 +4,8 @@ import urllib.parse
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.engine import URL
 from app.core.config import settings
+from app.core.deadline import max_budget
+from app.core import tracing
 
 def get_engine_settings():
     # Construct URL object directly to avoid parsing/escaping issues
@@ -44,8 +46,13 @@ def get_engine_settings():
     return url, connect_args
 
 database_url, connect_args = get_engine_settings()
+# Потолок для запросов ORM: дольше самого большого бюджета запроса выполнять их бессмысленно
+# (сами запросы отменяются раньше, по дедлайну запроса)
+connect_args["server_settings"] = {"statement_timeout": str(int(max_budget() * 1000))}
 
 engine = create_async_engine(database_url, echo=True, connect_args=connect_args)
+if settings.TRACING_ENABLED:
+    tracing.instrument_engine(engine)
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     autoflush=False,
@@ -1,28 +1,72 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-import time
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.logger import logger
 from app.api.api import api_router
 
-from app.core.redis import redis_client
-from fastapi_limiter import FastAPILimiter
+from app.core.redis import redis_client, client_cache
+from app.core.shm_cache import shared_cache
+from app.core.runtime import memory_watchdog
+from app.core.loop_monitor import loop_monitor
+from app.core.allocations import allocation_tracker
+from app.core.health import health_monitor
+from app.core.startup import startup_profiler, warm_up
+from app.core import openapi
+from app.core.compression import CompressionMiddleware
+from app.db.session import engine
+from app.core.concurrency import concurrency_limiter, is_unmetered, route_priority
+from app.core import deadline
+from app.core import tracing
+from app.core.deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceeded,
+    request_budget,
+    reset_deadline,
+    set_deadline,
+)
+
+# Внутренние эндпоинты, которые опрашиваются напрямую по HTTP внутри overlay-сети
+# (Prometheus, healthcheck) и не должны перенаправляться на HTTPS
+PLAIN_HTTP_PATHS = {"/api/metrics", "/api/health", "/api/ready"}
+
+def deadline_exceeded_response():
+    from fastapi.responses import JSONResponse
+    return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup logic
-    try:
-        await FastAPILimiter.init(redis_client)
-        logger.info("FastAPILimiter initialized.")
-    except Exception as e:
-        logger.error(f"Failed to initialize FastAPILimiter: {e}")
+    # Startup logic: соединения и выражения готовятся до приёма трафика
+    with startup_profiler.phase("warm_up"):
+        await warm_up()
+    if settings.REDIS_CLIENT_CACHE_ENABLED:
+        client_cache.start()
+    if settings.SHM_CACHE_ENABLED:
+        shared_cache.open()
+    health_monitor.start()
+    memory_watchdog.start()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
     
+    if startup_profiler.enabled:
+        logger.info(startup_profiler.report())
     logger.info("Application startup complete.")
     yield
-    # Shutdown logic
-    await redis_client.close()
+    # Shutdown logic: начатые запросы uvicorn уже завершил, закрываем пулы
     logger.info("Shutting down gracefully...")
+    await health_monitor.stop()
+    await memory_watchdog.stop()
+    await loop_monitor.stop()
+    await allocation_tracker.stop()
+    tracing.exporter.close()
+    await client_cache.stop()
+    shared_cache.close()
+    await redis_client.close()
+    await engine.dispose()
+    logger.info("Shutdown complete.")
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -39,7 +83,11 @@ def create_app() -> FastAPI:
         x_forwarded_proto = request.headers.get("x-forwarded-proto")
         
         # If the request is not HTTPS and we are not in DEBUG mode
-        if not settings.DEBUG and x_forwarded_proto != "https":
+        if (
+            not settings.DEBUG
+            and x_forwarded_proto != "https"
+            and request.url.path not in PLAIN_HTTP_PATHS
+        ):
             # You can either redirect or return 400. CSRF requirement suggested redirect or 400.
             # Redirecting to the same URL but with https
             url = request.url.replace(scheme="https")
@@ -55,6 +103,19 @@ def create_app() -> FastAPI:
             response.headers["Strict-Transport-Security"] = "max-age=0"
         return response
 
+    @app.middleware("http")
+    async def deadline_middleware(request: Request, call_next):
+        # Внутри log_requests, чтобы ответы 504 попадали в журнал
+        budget = request_budget(request.url.path, request.headers.get(DEADLINE_HEADER))
+        token = set_deadline(budget)
+        try:
+            async with deadline.bounded("request"):
+                return await call_next(request)
+        except DeadlineExceeded:
+            return deadline_exceeded_response()
+        finally:
+            reset_deadline(token)
+
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
         start_time = time.time()
@@ -81,6 +142,9 @@ def create_app() -> FastAPI:
             f"Status: {response.status_code} Duration: {duration:.4f}s "
             f"IP: {ip} UA: {user_agent}"
         )
+        trace = tracing.current()
+        if trace is not None and duration >= settings.TRACE_SLOW_THRESHOLD:
+            log_msg += f" Slow request breakdown: {trace.summary()}"
         
         if response.status_code >= 400:
             logger.warning(log_msg)
@@ -89,6 +153,53 @@ def create_app() -> FastAPI:
             
         return response
 
+    @app.middleware("http")
+    async def tracing_middleware(request: Request, call_next):
+        # Снаружи log_requests: журнал дописывает разбивку медленного запроса по трассе
+        if not settings.TRACING_ENABLED:
+            return await call_next(request)
+        token = tracing.start_trace()
+        trace = tracing.current()
+        try:
+            response = await call_next(request)
+        finally:
+            tracing.end_trace(token)
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = trace.server_timing(
+                hidden=tracing.hidden_categories(request.url.path)
+            )
+        tracing.finish(
+            trace,
+            slow=trace.elapsed() >= settings.TRACE_SLOW_THRESHOLD,
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code,
+        )
+        return response
+
+    @app.middleware("http")
+    async def load_shedding_middleware(request: Request, call_next):
+        # Добавлен последним из @app.middleware, поэтому отклоняет лишние запросы раньше остальных
+        if not settings.CONCURRENCY_LIMIT_ENABLED or is_unmetered(request.url.path):
+            return await call_next(request)
+
+        if not concurrency_limiter.try_acquire(route_priority(request.url.path)):
+            from fastapi.responses import JSONResponse
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, please retry later"},
+                headers={"Retry-After": "1"},
+            )
+
+        start_time = time.perf_counter()
+        try:
+            return await call_next(request)
+        finally:
+            concurrency_limiter.release(time.perf_counter() - start_time)
+
+    # Сжатие снаружи остальных middleware: сжимаются в том числе ответы 503 и 504
+    app.add_middleware(CompressionMiddleware)
+
     # Configure CORS - added AFTER other middlewares to be processed FIRST for responses
     app.add_middleware(
         CORSMiddleware,
@@ -98,7 +209,10 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    app.add_exception_handler(DeadlineExceeded, lambda request, exc: deadline_exceeded_response())
     app.include_router(api_router, prefix="/api")
+    app.state.openapi_artifact = openapi.install(app)
     return app
 
 app = create_app()
+startup_profiler.record("import app.main", time.perf_counter() - _IMPORT_STARTED)
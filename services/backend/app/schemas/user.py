@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from app.schemas.role import Role
 
 class UserBase(BaseModel):
@@ -26,3 +26,17 @@ class User(UserInDBBase):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+# Строка списка пользователей в админке (формат User.serialization())
+class UserListItem(BaseModel):
+    id: int
+    username: str
+    email: str
+    role_name: str
+    role_id: Optional[int] = None
+    is_active: bool
+    model_config = ConfigDict(from_attributes=True)
+
+class UserList(BaseModel):
+    users: List[UserListItem]
+    total: int
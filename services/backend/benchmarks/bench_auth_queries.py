@@ -0,0 +1,87 @@
+"""Микробенчмарк горячих запросов аутентификации: ORM против app.db.queries.
+
+Запуск (из services/backend, при доступной БД из настроек DB_*):
+
+    python -m benchmarks.bench_auth_queries --iterations 5000
+
+Для каждого запроса выводится процессорное время (process_time) на вызов
+и экономия быстрого пути относительно ORM. Берётся первый пользователь из таблицы users.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.db import queries
+from app.db.session import AsyncSessionLocal, engine
+from app.models.user import User
+
+async def _orm_user_with_role(db, user_id, email):
+    result = await db.execute(
+        select(User).where(User.id == user_id).options(selectinload(User.role_obj))
+    )
+    user = result.scalar_one_or_none()
+    db.expunge_all()
+    return user
+
+async def _orm_user_by_email(db, user_id, email):
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
+    db.expunge_all()
+    return user
+
+async def _orm_user_by_id(db, user_id, email):
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    db.expunge_all()
+    return user
+
+async def _fast_user_with_role(db, user_id, email):
+    return await queries.get_user_with_role_by_id(db, user_id)
+
+async def _fast_user_by_email(db, user_id, email):
+    return await queries.get_user_by_email(db, email)
+
+async def _fast_user_by_id(db, user_id, email):
+    return await queries.get_user_by_id(db, user_id)
+
+CASES = [
+    ("user+role by id (get_current_user)", _orm_user_with_role, _fast_user_with_role),
+    ("user by email (login)", _orm_user_by_email, _fast_user_by_email),
+    ("user by id (refresh)", _orm_user_by_id, _fast_user_by_id),
+]
+
+async def _measure(fn, db, user_id, email, iterations: int) -> float:
+    # Прогрев: подготовка выражений и кэш компиляции ORM
+    for _ in range(50):
+        await fn(db, user_id, email)
+    start = time.process_time()
+    for _ in range(iterations):
+        await fn(db, user_id, email)
+    return (time.process_time() - start) / iterations
+
+async def main(iterations: int) -> None:
+    # echo=True логирует каждый ORM-запрос и исказил бы сравнение
+    engine.sync_engine.echo = False
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.id, User.email).limit(1))
+        row = result.first()
+        if row is None:
+            raise SystemExit("users table is empty: create at least one user first")
+        user_id, email = row
+
+        print(f"{'query':40} {'orm, us':>10} {'fast, us':>10} {'saved':>8}")
+        for name, orm_fn, fast_fn in CASES:
+            orm = await _measure(orm_fn, db, user_id, email, iterations)
+            fast = await _measure(fast_fn, db, user_id, email, iterations)
+            saved = (1 - fast / orm) * 100 if orm else 0.0
+            print(f"{name:40} {orm * 1e6:10.1f} {fast * 1e6:10.1f} {saved:7.1f}%")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
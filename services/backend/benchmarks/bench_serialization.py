@@ -0,0 +1,84 @@
+"""Микробенчмарк сериализации ответов: прежний путь FastAPI против app.core.serialization.
+
+Запуск (из services/backend, БД не нужна):
+
+    python -m benchmarks.bench_serialization --iterations 2000
+
+Сравниваются:
+- список пользователей админки (100 строк): serialization() ORM-объектов +
+  jsonable_encoder + JSONResponse против строк столбцов, сериализуемых TypeAdapter сразу в байты;
+- профиль /auth/me: валидация UserRow через UserSchema (response_model) +
+  jsonable_encoder + JSONResponse против прямой сериализации UserRow.
+Выводится процессорное время на один ответ.
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import dump_json
+from app.db.queries import RoleRow, UserRow
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.user import User as UserSchema, UserList
+
+def _orm_users(count: int):
+    role = Role(id=1, name="user", description="Обычный пользователь")
+    return [
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x",
+             role_id=1, is_active=True, role_obj=role)
+        for i in range(count)
+    ]
+
+def _column_rows(count: int):
+    return [
+        SimpleNamespace(id=i, username=f"user{i}", email=f"user{i}@example.com",
+                        role_name="user", role_id=1, is_active=True)
+        for i in range(count)
+    ]
+
+def _user_row():
+    return UserRow(
+        id=1, username="user1", email="user1@example.com", hashed_password="x", role_id=1,
+        is_active=True, role_obj=RoleRow(id=1, name="user", description="Обычный пользователь"),
+    )
+
+def _measure(fn, iterations: int) -> float:
+    for _ in range(50):
+        fn()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+def main(iterations: int, page_size: int) -> None:
+    users, rows, row = _orm_users(page_size), _column_rows(page_size), _user_row()
+
+    cases = [
+        (
+            f"admin users list ({page_size} rows)",
+            lambda: JSONResponse(jsonable_encoder({"users": [u.serialization() for u in users], "total": 1000})).body,
+            lambda: dump_json(UserList, {"users": rows, "total": 1000}, from_attributes=True),
+        ),
+        (
+            "auth/me",
+            lambda: JSONResponse(jsonable_encoder(UserSchema.model_validate(row).model_dump(mode="json"))).body,
+            lambda: dump_json(UserRow, row, exclude={"hashed_password"}),
+        ),
+    ]
+
+    print(f"{'response':32} {'old, us':>10} {'fast, us':>10} {'saved':>8}")
+    for name, old_fn, fast_fn in cases:
+        old = _measure(old_fn, iterations)
+        fast = _measure(fast_fn, iterations)
+        saved = (1 - fast / old) * 100 if old else 0.0
+        print(f"{name:32} {old * 1e6:10.1f} {fast * 1e6:10.1f} {saved:7.1f}%")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    main(args.iterations, args.page_size)
@@ -0,0 +1,76 @@
+"""Микробенчмарк чтения из общего кэша воркеров против GET в Redis.
+
+Запуск (из services/backend; Redis — из настроек REDIS_*, без него сравнение с Redis пропускается):
+
+    python -m benchmarks.bench_shm_cache --iterations 20000 --value-size 12000
+
+Сравниваются словарь процесса, SharedMemoryCache (mmap-файл во временном
+каталоге) и GET в Redis тем же клиентом, что и в приложении. Для кэшей
+выводится время на чтение по часам (perf_counter): для Redis основную часть
+составляет сетевой round trip, а не процессор.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.core.shm_cache import SharedMemoryCache
+
+KEY = "cache:admin_users:0123456789abcdef:da39a3ee5e6b4b0d3255bfef95601890afd80709"
+
+def _measure(fn, iterations: int) -> float:
+    for _ in range(100):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+async def _measure_redis(value: bytes, iterations: int):
+    from app.core.redis import redis_client
+
+    try:
+        await redis_client.set(KEY, value, ex=60)
+    except Exception as e:
+        print(f"{'redis GET':24} skipped: {e}")
+        return None
+    for _ in range(100):
+        await redis_client.get(KEY)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await redis_client.get(KEY)
+    elapsed = (time.perf_counter() - start) / iterations
+    await redis_client.delete(KEY)
+    await redis_client.close()
+    return elapsed
+
+def main(iterations: int, value_size: int) -> None:
+    value = os.urandom(value_size)
+    local = {KEY: value}
+
+    with tempfile.TemporaryDirectory() as directory:
+        shm = SharedMemoryCache(os.path.join(directory, "cache"), slots=1024, slot_size=max(16384, value_size + 512))
+        shm.open()
+        shm.set(KEY, value, ttl=3600)
+        results = [
+            ("process dict", _measure(lambda: local.get(KEY), iterations)),
+            ("shared memory get", _measure(lambda: shm.get(KEY), iterations)),
+            ("shared memory set", _measure(lambda: shm.set(KEY, value, ttl=3600), iterations)),
+        ]
+        shm.close()
+
+    redis_time = asyncio.run(_measure_redis(value, max(iterations // 10, 100)))
+    if redis_time is not None:
+        results.append(("redis GET", redis_time))
+
+    print(f"{'operation':24} {'us/op':>10}   value {value_size} bytes")
+    for name, seconds in results:
+        print(f"{name:24} {seconds * 1e6:10.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--value-size", type=int, default=12000)
+    args = parser.parse_args()
+    main(args.iterations, args.value_size)
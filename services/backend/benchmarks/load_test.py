@@ -0,0 +1,275 @@
+"""Нагрузочный тест горячих путей аутентификации и админки по HTTP.
+
+Запуск (из services/backend, бэкенд с Postgres и Redis уже поднят, например `make up`):
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 20 --duration 30 \\
+        --output loadtest.json --baseline benchmarks/loadtest_baseline.json
+
+Сценарии: register, login, refresh, me, admin_list, admin_search. Для
+админских нужна учётная запись администратора (--admin-email и
+--admin-password или LOADTEST_ADMIN_EMAIL / LOADTEST_ADMIN_PASSWORD), без неё
+они пропускаются. Каждый сценарий по очереди нагружается замкнутым циклом:
+concurrency виртуальных клиентов, каждый отправляет следующий запрос сразу
+после ответа на предыдущий. Первые --warmup секунд в статистику не входят.
+
+Перед замером регистрируются по одному пользователю на клиента (адреса
+lt-<run>-<n>@example.com), чтобы refresh не отзывал токены соседних клиентов.
+Лимиты запросов (login — 5 в минуту с IP) нагрузку с одного адреса отклонят:
+бэкенд для замера запускают с RATE_LIMIT_ENABLED=false. Ответы 429 и 503
+(сброс нагрузки, бюджет хеширования) считаются ошибками и видны в status_counts.
+
+Результат — JSON (--output, иначе stdout): по сценарию число запросов,
+RPS, доля ошибок, p50/p95/p99 и максимум в миллисекундах. С --baseline
+результат сравнивается с сохранённым: падение RPS или рост p95/p99 больше
+--tolerance, либо рост доли ошибок больше чем на 1 п.п. — регрессия, код
+выхода 1. --save-baseline записывает результат как новый эталон. Эталон
+снимают на той же машине и с теми же параметрами, что и проверку.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+PASSWORD = "load-test-password"
+SCENARIOS = ("register", "login", "refresh", "me", "admin_list", "admin_search")
+ADMIN_SCENARIOS = ("admin_list", "admin_search")
+# Допустимый рост доли ошибок относительно эталона
+ERROR_RATE_SLACK = 0.01
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Процентиль по ближайшему рангу (значения отсортированы по возрастанию)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.errors = 0
+
+    def add(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        values = sorted(self.latencies)
+        requests = len(values)
+        return {
+            "requests": requests,
+            "rps": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            "status_counts": dict(sorted(self.status_counts.items())),
+        }
+
+class Session:
+    """Виртуальный клиент: свой пользователь и свои куки (access_token, refresh_token)."""
+
+    def __init__(self, client: httpx.AsyncClient, email: str):
+        self.client = client
+        self.email = email
+
+class LoadTest:
+    def __init__(self, base_url: str, concurrency: int, origin: str,
+                 admin_email: Optional[str], admin_password: Optional[str],
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.origin = origin
+        self.admin_email = admin_email
+        self.admin_password = admin_password
+        self.transport = transport
+        self.run_id = uuid.uuid4().hex[:8]
+        self.sessions: List[Session] = []
+        self.admin_headers: Optional[dict] = None
+        self._registered = 0
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Origin": self.origin},
+            timeout=30.0,
+            transport=self.transport,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+        )
+
+    def _next_email(self) -> str:
+        self._registered += 1
+        return f"lt-{self.run_id}-{self._registered}@example.com"
+
+    async def _register(self, client: httpx.AsyncClient, email: str) -> httpx.Response:
+        return await client.post(
+            "/api/auth/register",
+            json={"username": email.split("@")[0], "email": email, "password": PASSWORD},
+        )
+
+    async def _login(self, client: httpx.AsyncClient, email: str, password: str = PASSWORD) -> httpx.Response:
+        return await client.post("/api/auth/login", data={"username": email, "password": password})
+
+    async def setup(self, scenarios) -> None:
+        for _ in range(self.concurrency):
+            client = self._client()
+            email = self._next_email()
+            response = await self._register(client, email)
+            if response.status_code != 200:
+                raise RuntimeError(f"Cannot register {email}: {response.status_code} {response.text}")
+            self.sessions.append(Session(client, email))
+
+        if any(name in ADMIN_SCENARIOS for name in scenarios):
+            if not (self.admin_email and self.admin_password):
+                return
+            async with self._client() as client:
+                response = await self._login(client, self.admin_email, self.admin_password)
+                if response.status_code != 200:
+                    raise RuntimeError(f"Admin login failed: {response.status_code} {response.text}")
+                self.admin_headers = {"Authorization": f"Bearer {client.cookies['access_token']}"}
+
+    async def close(self) -> None:
+        for session in self.sessions:
+            await session.client.aclose()
+
+    async def _request(self, name: str, session: Session, counter: int) -> httpx.Response:
+        client = session.client
+        if name == "register":
+            return await self._register(client, self._next_email())
+        if name == "login":
+            return await self._login(client, session.email)
+        if name == "refresh":
+            return await client.post("/api/auth/refresh")
+        if name == "me":
+            return await client.get("/api/auth/me")
+        if name == "admin_list":
+            return await client.get(
+                "/api/admin/users", params={"page": counter % 5 + 1, "limit": 20}, headers=self.admin_headers
+            )
+        if name == "admin_search":
+            return await client.get(
+                "/api/admin/users", params={"search": f"lt-{self.run_id}", "limit": 20}, headers=self.admin_headers
+            )
+        raise ValueError(f"Unknown scenario {name}")
+
+    async def run_scenario(self, name: str, duration: float, warmup: float) -> dict:
+        recorder = Recorder()
+        started = time.perf_counter()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+
+        async def user(session: Session) -> None:
+            counter = 0
+            while True:
+                request_started = time.perf_counter()
+                if request_started >= stop_at:
+                    return
+                try:
+                    response = await self._request(name, session, counter)
+                    status, ok = str(response.status_code), response.status_code == 200
+                except httpx.HTTPError as e:
+                    status, ok = type(e).__name__, False
+                finished = time.perf_counter()
+                counter += 1
+                if request_started >= measure_from:
+                    recorder.add(finished - request_started, status, ok)
+
+        await asyncio.gather(*(user(session) for session in self.sessions))
+        return recorder.summary(time.perf_counter() - measure_from)
+
+    async def run(self, scenarios, duration: float, warmup: float) -> dict:
+        await self.setup(scenarios)
+        results = {}
+        try:
+            for name in scenarios:
+                if name in ADMIN_SCENARIOS and self.admin_headers is None:
+                    print(f"{name}: skipped, no admin credentials", file=sys.stderr)
+                    continue
+                results[name] = await self.run_scenario(name, duration, warmup)
+                print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+        finally:
+            await self.close()
+        return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Регрессии результата относительно эталона (пустой список — регрессий нет)."""
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = results.get("scenarios", {}).get(name)
+        if current is None:
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {base['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current[key]} > baseline {base[key]}")
+        if current["error_rate"] > base["error_rate"] + ERROR_RATE_SLACK:
+            regressions.append(f"{name}: error_rate {current['error_rate']} > baseline {base['error_rate']}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Сценарий (можно несколько раз); по умолчанию все")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Секунд замера на сценарий")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Секунд прогрева перед замером")
+    parser.add_argument("--origin", default="http://localhost:3000",
+                        help="Заголовок Origin (refresh по куке вне DEBUG проверяет его по CORS_ORIGINS)")
+    parser.add_argument("--admin-email", default=os.getenv("LOADTEST_ADMIN_EMAIL"))
+    parser.add_argument("--admin-password", default=os.getenv("LOADTEST_ADMIN_PASSWORD"))
+    parser.add_argument("--output", help="Файл для результата в JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="Эталон для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое ухудшение RPS и p95/p99, доля")
+    parser.add_argument("--save-baseline", help="Сохранить результат как эталон в этот файл")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    test = LoadTest(args.base_url, args.concurrency, args.origin, args.admin_email, args.admin_password)
+    results = {
+        "meta": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "started_at": time.time(),
+        },
+        "scenarios": asyncio.run(test.run(scenarios, args.duration, args.warmup)),
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("concurrency") != args.concurrency:
+            print("warning: baseline was recorded with a different concurrency", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
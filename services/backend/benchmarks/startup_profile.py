@@ -0,0 +1,75 @@
+"""Профиль холодного старта воркера: время импорта по модулям и этапы lifespan.
+
+Запуск (из services/backend):
+
+    python -m benchmarks.startup_profile --top 25
+    python -m benchmarks.startup_profile --lifespan   # плюс прогрев (нужны БД и Redis)
+
+Импорт app.main выполняется в отдельном процессе с -X importtime, поэтому
+модули не закэшированы. Выводятся самые дорогие модули по собственному
+времени импорта и суммарное время по пакетам верхнего уровня. В работающем
+контейнере тот же отчёт gunicorn пишет в stderr при PYTHONPROFILEIMPORTTIME=1.
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_times():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+def report_imports(top: int) -> None:
+    modules = import_times()
+    total = sum(self_us for _, self_us, _, _ in modules)
+    print(f"Import of app.main: {total / 1000:.1f} ms, {len(modules)} modules\n")
+
+    print(f"Top {top} modules by self time:")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: -m[1])[:top]:
+        print(f"  {name:<50} self {self_us / 1000:7.1f} ms   cumulative {cumulative_us / 1000:7.1f} ms")
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    print(f"\nTop {top} packages by total self time:")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:top]:
+        print(f"  {package:<30} {self_us / 1000:7.1f} ms ({self_us / total:5.1%})")
+
+async def report_lifespan() -> None:
+    from app.main import app
+    from app.core.startup import startup_profiler
+
+    async with app.router.lifespan_context(app):
+        pass
+    print("\n" + startup_profiler.report())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--lifespan", action="store_true", help="also run app startup/shutdown and print phase timings")
+    args = parser.parse_args()
+
+    report_imports(args.top)
+    if args.lifespan:
+        asyncio.run(report_lifespan())
+
+if __name__ == "__main__":
+    main()
@@ -8,5 +8,32 @@ if [ $# -gt 0 ]; then
     exec "$@"
 fi
 
+# Плавная остановка: по SIGTERM сначала переводим /api/ready в 503 (файл-флаг) и ждём,
+# пока балансировщик уберёт задачу, и только потом останавливаем gunicorn
+DRAIN_FLAG_FILE="${SHUTDOWN_DRAIN_FLAG_FILE:-/tmp/draining}"
+DRAIN_DELAY="${SHUTDOWN_DRAIN_DELAY:-15}"
+rm -f "$DRAIN_FLAG_FILE"
+
+drain() {
+    echo "SIGTERM received, draining for ${DRAIN_DELAY}s..."
+    touch "$DRAIN_FLAG_FILE"
+    sleep "$DRAIN_DELAY"
+    kill -TERM "$child" 2>/dev/null
+}
+trap drain TERM INT
+
 echo "Starting application..."
-exec gunicorn app.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 --access-logfile - --error-logfile -
+# Воркеры, preload и хуки — в gunicorn.conf.py
+gunicorn app.main:app -c gunicorn.conf.py &
+child=$!
+
+# Первый wait прерывается сигналом (код 143, поэтому без set -e), второй дожидается
+# завершения gunicorn после drain; код выхода скрипта — код gunicorn
+status=0
+wait "$child" || status=$?
+trap - TERM INT
+if kill -0 "$child" 2>/dev/null; then
+    status=0
+    wait "$child" || status=$?
+fi
+exit "$status"
@@ -0,0 +1,75 @@
+"""Настройки gunicorn (entrypoint.sh: gunicorn app.main:app -c gunicorn.conf.py).
+
+Режим preload (GUNICORN_PRELOAD=true, по умолчанию): приложение импортируется
+в мастере один раз, воркеры получают его через fork. Страницы с кодом и
+объектами FastAPI, SQLAlchemy, Pydantic, passlib и jose остаются общими
+(copy-on-write), пока их не тронет запись. Запись в страницы делает и сборщик
+мусора (счётчики в заголовках объектов), поэтому перед fork объекты мастера
+переносятся в постоянное поколение gc.freeze() и сборщиком больше не обходятся.
+
+Соединения с БД и Redis в мастере не открываются: при импорте создаются
+только объекты пулов, а соединения открывает lifespan каждого воркера
+(app/main.py, прогрев в app/core/startup.py).
+
+Уникальная память воркеров: метрика process_memory_bytes{kind="uss"} в
+/api/metrics или python -m app.core.memory внутри контейнера.
+
+Число воркеров по умолчанию — по квоте CPU контейнера (app/core/runtime.py),
+GUNICORN_WORKERS задаёт его явно. Воркер перезапускается после
+GUNICORN_MAX_REQUESTS запросов (с разбросом, чтобы не все сразу) или при
+превышении WORKER_MAX_USS_MB; начатые запросы при этом завершаются.
+uvloop и httptools (uvicorn[standard]) выбираются UvicornWorker
+автоматически, если установлены.
+"""
+import gc
+import os
+import sys
+
+from app.core.runtime import cpu_limit, worker_count
+
+def _importable(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "0")) or worker_count(
+    per_cpu=float(os.environ.get("GUNICORN_WORKERS_PER_CPU", "1")),
+    minimum=int(os.environ.get("GUNICORN_MIN_WORKERS", "2")),
+    maximum=int(os.environ.get("GUNICORN_MAX_WORKERS", "8")),
+)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+# Дожидаемся начатых запросов после SIGTERM (см. SHUTDOWN_DRAIN_DELAY в entrypoint.sh)
+graceful_timeout = 30
+accesslog = "-"
+errorlog = "-"
+# Утечки и фрагментация памяти не копятся бесконечно: воркер перезапускается после N запросов
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+def when_ready(server):
+    loop = "uvloop" if _importable("uvloop") else "asyncio"
+    http = "httptools" if _importable("httptools") else "h11"
+    server.log.info(f"{workers} workers for {cpu_limit():.2f} CPUs, loop={loop}, http={http}")
+    if preload_app:
+        # Мусор после импорта собирается до заморозки, иначе он останется в памяти навсегда
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"Application preloaded in master, {gc.get_freeze_count()} objects frozen")
+
+def pre_fork(server, worker):
+    # Объекты, созданные мастером после when_ready (например, при перезапуске воркера)
+    if preload_app:
+        gc.freeze()
+
+def post_fork(server, worker):
+    session = sys.modules.get("app.db.session")
+    if session is not None:
+        # Пул, унаследованный от мастера, не должен отдавать воркеру чужие соединения
+        session.engine.sync_engine.dispose(close=False)
@@ -0,0 +1,66 @@
+import asyncio
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core.allocations import AllocationTracker
+from app.main import app
+
+retained = []
+
+def leak():
+    retained.append([object() for _ in range(5000)])
+
+def test_diff_points_at_the_line_that_retains_memory():
+    async def scenario():
+        tracker = AllocationTracker(max_snapshots=3, max_duration=60)
+        tracker.start(frames=1)
+        try:
+            base = tracker.snapshot()
+            for _ in range(5):
+                leak()
+            tracker.snapshot()
+            top = tracker.top(group_by="filename")
+            diff = tracker.diff(base["id"])
+            status = tracker.status()
+        finally:
+            await tracker.stop()
+        return top, diff, status, tracker.status()
+
+    top, diff, status, stopped = asyncio.run(scenario())
+    retained.clear()
+
+    assert diff[0]["file"].endswith("test_allocations.py")
+    assert diff[0]["line"] == leak.__code__.co_firstlineno + 1
+    assert diff[0]["size_diff"] > 0 and diff[0]["count_diff"] >= 25000
+    assert "line" not in top[0]
+    assert status["active"] and len(status["snapshots"]) == 2
+    assert not stopped["active"] and stopped["snapshots"] == []
+    assert not tracemalloc.is_tracing()
+
+def test_tracing_stops_by_itself_after_duration():
+    async def scenario():
+        tracker = AllocationTracker(max_duration=0.05)
+        tracker.start(interval=0.01)
+        await asyncio.sleep(0.2)
+        return tracker.active
+
+    assert asyncio.run(scenario()) is False
+    assert not tracemalloc.is_tracing()
+
+def test_memory_endpoints_are_admin_only_and_need_active_tracing():
+    client = TestClient(app)
+    assert client.get("/api/admin/debug/memory").status_code == 401
+
+    app.dependency_overrides[deps.get_current_active_admin] = lambda: None
+    try:
+        status = client.get("/api/admin/debug/memory")
+        snapshot = client.post("/api/admin/debug/memory/snapshots")
+        diff = client.get("/api/admin/debug/memory/diff", params={"base": 1})
+    finally:
+        app.dependency_overrides.clear()
+    assert status.status_code == 200 and status.json()["active"] is False
+    assert "x-worker-id" in status.headers
+    assert snapshot.status_code == 409
+    assert diff.status_code == 404
@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.redis import get_redis_batch, redis_breaker, replica_breaker
+from app.core.redis_cache import ClientSideCache
+from app.db.queries import UserRow
+from app.main import app
+
+class FakeBatch:
+    """RedisBatch для проверки denylist: набор отозванных ключей или недоступный Redis."""
+    def __init__(self, revoked=(), down=False, breaker=redis_breaker):
+        self.revoked = set(revoked)
+        self.down = down
+        self.breaker = breaker
+        self.checked = []
+
+    async def exists(self, key):
+        if self.down:
+            raise ConnectionError("redis is down")
+        self.checked.append(key)
+        return int(key in self.revoked)
+
+def _me(monkeypatch, batch, revoke=False, token=None):
+    async def no_etag(*args, **kwargs):
+        return None
+
+    async def load_user(user_id):
+        return UserRow(id=user_id, username="alice", email="alice@example.com",
+                       hashed_password="secret-hash", role_id=None, is_active=True, role_obj=None)
+
+    monkeypatch.setattr("app.api.endpoints.auth.versions.etag", no_etag)
+    monkeypatch.setattr(deps, "_load_user", load_user)
+    # Токен с jti (как refresh-токен), иначе проверка denylist не выполняется
+    token = token or security.create_refresh_token(7)
+    jti = security.decode_token(token)["jti"]
+    if revoke:
+        batch.revoked.add(f"denylist:{jti}")
+    app.dependency_overrides[get_redis_batch] = lambda: batch
+    try:
+        return TestClient(app).get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        app.dependency_overrides.clear()
+
+def test_revoked_token_is_rejected(monkeypatch):
+    response = _me(monkeypatch, FakeBatch(), revoke=True)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+
+def test_valid_token_loads_the_user(monkeypatch):
+    batch = FakeBatch(revoked={"denylist:other"})
+    response = _me(monkeypatch, batch)
+    assert response.status_code == 200
+    assert response.json()["id"] == 7
+    assert len(batch.checked) == 1
+
+def test_revocation_is_not_hidden_by_the_client_cache(monkeypatch):
+    # Инвалидация приходит с мастера; чтение denylist тоже идёт в мастер (get_redis_batch),
+    # поэтому отстающая реплика не может вернуть «не отозван» и закэшировать его
+    cache = ClientSideCache({}, prefixes=["denylist:"])
+    cache._ready = True
+    monkeypatch.setattr(deps, "client_cache", cache)
+    master = FakeBatch()
+    token = security.create_refresh_token(7)
+
+    assert _me(monkeypatch, master, token=token).status_code == 200
+    assert _me(monkeypatch, master, token=token).status_code == 200
+    assert len(master.checked) == 1
+
+    key = f"denylist:{security.decode_token(token)['jti']}"
+    master.revoked.add(key)
+    asyncio.run(cache._on_invalidate(["invalidate", [key]]))
+    response = _me(monkeypatch, master, token=token)
+    assert response.status_code == 401
+    assert len(master.checked) == 2
+
+def test_redis_down_fail_open_skips_the_denylist_check(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_DENYLIST_CHECK_POLICY", "fail_open")
+    response = _me(monkeypatch, FakeBatch(down=True))
+    assert response.status_code == 200
+
+def test_redis_down_fail_open_expires_after_the_access_token_lifetime(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_DENYLIST_CHECK_POLICY", "fail_open")
+    monkeypatch.setattr(
+        "app.core.redis.redis_breaker.degraded_seconds",
+        lambda: settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1,
+    )
+    response = _me(monkeypatch, FakeBatch(down=True))
+    assert response.status_code == 503
+
+def test_replica_down_fail_open_is_bounded_by_the_replica_breaker(monkeypatch):
+    # Лежит только реплика: мастер здоров, но окно fail_open считается по автомату реплики
+    monkeypatch.setattr(settings, "REDIS_DENYLIST_CHECK_POLICY", "fail_open")
+    redis_breaker.reset()
+    replica_breaker.reset()
+    replica_breaker.record_failure()
+    replica_breaker._degraded_since -= settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 1
+    try:
+        response = _me(monkeypatch, FakeBatch(down=True, breaker=replica_breaker))
+    finally:
+        replica_breaker.reset()
+    assert response.status_code == 503
+
+def test_redis_down_fail_closed_returns_503(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_DENYLIST_CHECK_POLICY", "fail_closed")
+    response = _me(monkeypatch, FakeBatch(down=True))
+    assert response.status_code == 503
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from app.core.redis import redis_breaker, fail_open_allowed, FAIL_OPEN, FAIL_CLOSED
+
+async def _fail():
+    raise ConnectionError("down")
+
+async def _ok():
+    return "ok"
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60, failure_exceptions=(ConnectionError,))
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await breaker.call(_fail)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+
+    asyncio.run(main())
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("test_probe", failure_threshold=1, reset_timeout=0.01, failure_exceptions=(ConnectionError,))
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        await asyncio.sleep(0.02)
+        assert breaker.state == HALF_OPEN
+        # Неудачная проба снова открывает автомат
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state == OPEN
+        await asyncio.sleep(0.02)
+        assert await breaker.call(_ok) == "ok"
+        assert breaker.state == CLOSED
+
+    asyncio.run(main())
+
+def test_only_one_probe_in_half_open():
+    breaker = CircuitBreaker("test_single_probe", failure_threshold=1, reset_timeout=0.01, failure_exceptions=(ConnectionError,))
+
+    async def slow_ok():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await breaker.call(_fail)
+        await asyncio.sleep(0.02)
+        probe = asyncio.ensure_future(breaker.call(slow_ok))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+        assert await probe == "ok"
+
+    asyncio.run(main())
+
+def test_degraded_policies():
+    redis_breaker.reset()
+    assert fail_open_allowed("test", FAIL_OPEN, max_degraded_seconds=60) is True
+    assert fail_open_allowed("test", FAIL_CLOSED) is False
+
+    redis_breaker.record_failure()
+    redis_breaker._degraded_since -= 120
+    try:
+        # Окно fail_open истекло — место вызова начинает отказывать
+        assert fail_open_allowed("test", FAIL_OPEN, max_degraded_seconds=60) is False
+        assert fail_open_allowed("test", FAIL_OPEN) is True
+    finally:
+        redis_breaker.reset()
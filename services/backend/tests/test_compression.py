@@ -0,0 +1,75 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, negotiate
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+@app.get("/large")
+async def large():
+    return {"users": [{"id": i, "username": f"user{i}"} for i in range(100)]}
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+@app.get("/export")
+async def export():
+    async def rows():
+        for i in range(500):
+            yield f"{i},user{i}\n".encode()
+    return StreamingResponse(rows(), media_type="text/csv")
+
+@app.get("/precompressed")
+async def precompressed():
+    return Response(gzip.compress(b"x" * 500), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+@app.get("/image")
+async def image():
+    return Response(b"\x89PNG" * 100, media_type="image/png")
+
+client = TestClient(app)
+
+def test_negotiate_respects_quality_values():
+    assert negotiate(None) is None
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") in ("br", "gzip")
+    assert negotiate("br;q=0, gzip;q=0.5") == "gzip"
+
+def test_large_json_is_compressed_and_small_is_not():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert len(response.json()["users"]) == 100
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+def test_small_response_through_app_middleware_is_not_compressed():
+    # В приложении ответы проходят через @app.middleware и приходят частями
+    from app.main import app as main_app
+
+    response = TestClient(main_app).get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_streaming_response_is_compressed_in_chunks():
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[499] == "499,user499"
+
+def test_encoded_and_binary_responses_pass_through():
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert response.content == b"x" * 500
+
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+from app.core import concurrency
+from app.core.concurrency import HIGH, LOW, NORMAL, AdaptiveConcurrencyLimiter, route_priority
+from app.main import app
+
+def _saturate(limiter, latency, rounds=200):
+    # Воркер полностью загружен: каждое освобождение сразу сменяется новым запросом
+    limiter.in_flight = int(limiter.limit)
+    for _ in range(rounds):
+        limiter.in_flight += 1
+        limiter.release(latency)
+
+def test_limit_grows_with_stable_latency_and_drops_when_it_rises():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20, min_limit=5, max_limit=200)
+    _saturate(limiter, 0.01)
+    grown = limiter.limit
+    assert grown > 20
+
+    _saturate(limiter, 0.2, rounds=50)
+    assert limiter.limit < grown / 2
+    assert limiter.limit >= limiter.min_limit
+
+def test_idle_worker_does_not_inflate_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=20, min_limit=5, max_limit=200)
+    for _ in range(200):
+        assert limiter.try_acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 20
+
+def test_low_priority_is_shed_first():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=5, max_limit=200)
+    admitted = 0
+    while limiter.try_acquire(LOW):
+        admitted += 1
+    assert admitted == 5
+    while limiter.try_acquire(NORMAL):
+        admitted += 1
+    assert admitted == 9
+    # Остаток лимита зарезервирован для health-проверок и refresh
+    assert limiter.try_acquire(HIGH)
+    assert not limiter.try_acquire(HIGH)
+
+def test_route_priorities():
+    assert route_priority("/api/health") == HIGH
+    assert route_priority("/api/ready") == HIGH
+    assert route_priority("/api/auth/refresh") == HIGH
+    assert route_priority("/api/admin/users") == LOW
+    assert route_priority("/api/auth/login") == NORMAL
+
+def test_overloaded_worker_returns_fast_503(monkeypatch):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=5, max_limit=200)
+    limiter.in_flight = 10
+    monkeypatch.setattr("app.main.concurrency_limiter", limiter)
+
+    response = TestClient(app).get("/api/")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert concurrency.concurrency_requests.get(priority=NORMAL, result="shed") >= 1
+
+def test_readiness_probe_is_admitted_while_normal_traffic_is_shed(monkeypatch):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=5, max_limit=200)
+    # Свободен только резерв HIGH
+    limiter.in_flight = 9
+    monkeypatch.setattr("app.main.concurrency_limiter", limiter)
+    client = TestClient(app)
+
+    assert client.get("/api/").status_code == 503
+    probe = client.get("/api/ready")
+    # Ответ самой проверки готовности (200 или 503 со снимком), а не сброс нагрузки
+    assert "ready" in probe.json()
+    assert "Retry-After" not in probe.headers
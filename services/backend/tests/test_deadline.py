@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import deadline
+from app.core.circuit_breaker import CLOSED, CircuitBreaker
+from app.core.deadline import DEADLINE_HEADER, DeadlineExceeded, max_budget, request_budget
+from app.main import app
+
+def test_header_can_only_shorten_route_budget():
+    assert request_budget("/api/auth/login", None) == 5.0
+    assert request_budget("/api/auth/login", "1500") == 1.5
+    assert request_budget("/api/auth/login", "600000") == 5.0
+    assert request_budget("/api/auth/login", "garbage") == 5.0
+
+def test_statement_timeout_ceiling_ignores_debug_routes():
+    # Профилирование ждёт до 90 с, но потолок statement_timeout задают маршруты, работающие с БД
+    assert request_budget("/api/admin/debug/profile", None) == 90.0
+    assert max_budget() == max(15.0, deadline.settings.REQUEST_TIMEOUT_DEFAULT)
+
+def test_bounded_cancels_work_past_deadline():
+    breaker = CircuitBreaker("test_deadline", failure_threshold=1, reset_timeout=60,
+                             failure_exceptions=(asyncio.TimeoutError,))
+
+    async def scenario():
+        token = deadline.set_deadline(0.05)
+        try:
+            with pytest.raises(DeadlineExceeded):
+                async with deadline.bounded("redis"):
+                    await breaker.call(asyncio.sleep, 1)
+        finally:
+            deadline.reset_deadline(token)
+        # Вне запроса ограничений нет
+        async with deadline.bounded("redis"):
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    # Отмена по дедлайну не считается отказом зависимости
+    assert breaker.state == CLOSED
+
+def test_expired_budget_returns_504():
+    response = TestClient(app).get("/api/", headers={DEADLINE_HEADER: "0"})
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Request deadline exceeded"
@@ -0,0 +1,97 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import NullPool
+
+from app.db import queries
+from app.db.queries import RoleRow, UserRow
+from app.db.session import database_url, connect_args
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+
+def _orm_user(with_role=True):
+    role = Role(id=2, name="user", description="Default role") if with_role else None
+    return User(
+        id=1, username="alice", email="alice@example.com", hashed_password="x",
+        role_id=2 if with_role else None, is_active=True, role_obj=role,
+    )
+
+def _row_user(with_role=True):
+    role = RoleRow(id=2, name="user", description="Default role") if with_role else None
+    return UserRow(
+        id=1, username="alice", email="alice@example.com", hashed_password="x",
+        role_id=2 if with_role else None, is_active=True, role_obj=role,
+    )
+
+@pytest.mark.parametrize("with_role", [True, False])
+def test_row_serializes_like_orm_model(with_role):
+    orm_user, row_user = _orm_user(with_role), _row_user(with_role)
+    assert row_user.serialization() == orm_user.serialization()
+    assert (
+        UserSchema.model_validate(row_user).model_dump()
+        == UserSchema.model_validate(orm_user).model_dump()
+    )
+
+async def _db_available() -> bool:
+    engine = create_async_engine(database_url, poolclass=NullPool, connect_args=connect_args)
+    try:
+        async with engine.connect():
+            return True
+    except Exception:
+        return False
+    finally:
+        await engine.dispose()
+
+def _require_db():
+    if not asyncio.run(_db_available()):
+        pytest.skip("PostgreSQL is not available")
+
+async def _parity_check():
+    engine = create_async_engine(database_url, poolclass=NullPool, connect_args=connect_args)
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            await db.begin()
+            suffix = uuid.uuid4().hex[:8]
+            role = Role(name=f"parity-{suffix}", description="parity")
+            db.add(role)
+            await db.flush()
+            with_role = User(username="parity", email=f"role-{suffix}@example.com",
+                             hashed_password="h", role_id=role.id, is_active=True)
+            without_role = User(username="parity", email=f"norole-{suffix}@example.com",
+                                hashed_password="h", role_id=None, is_active=False)
+            db.add_all([with_role, without_role])
+            await db.flush()
+
+            for user in (with_role, without_role):
+                result = await db.execute(
+                    select(User).where(User.id == user.id).options(selectinload(User.role_obj))
+                )
+                orm = result.scalar_one()
+
+                fast = await queries.get_user_with_role_by_id(db, user.id)
+                assert fast.serialization() == orm.serialization()
+                assert (
+                    UserSchema.model_validate(fast).model_dump()
+                    == UserSchema.model_validate(orm).model_dump()
+                )
+
+                by_id = await queries.get_user_by_id(db, user.id)
+                by_email = await queries.get_user_by_email(db, user.email)
+                for row in (by_id, by_email):
+                    assert row.id == orm.id
+                    assert row.hashed_password == orm.hashed_password
+                    assert row.is_active == orm.is_active
+
+            assert await queries.get_user_by_email(db, f"missing-{suffix}@example.com") is None
+            await db.rollback()
+    finally:
+        await engine.dispose()
+
+def test_fast_queries_match_orm():
+    _require_db()
+    asyncio.run(_parity_check())
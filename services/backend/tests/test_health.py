@@ -0,0 +1,70 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.health import HealthMonitor
+from app.main import app
+
+async def _ok():
+    pass
+
+async def _fail():
+    raise ConnectionError("connection refused")
+
+def test_readiness_reflects_critical_and_optional_checks():
+    monitor = HealthMonitor(interval=5, timeout=1)
+    monitor.register("database", _ok)
+    monitor.register("redis", _fail, critical=False)
+    assert monitor.snapshot()["ready"] is False
+
+    asyncio.run(monitor.run_once())
+    snapshot = monitor.snapshot()
+    assert snapshot["ready"] is True
+    assert snapshot["status"] == "degraded"
+    assert snapshot["checks"]["redis"]["error"] == "connection refused"
+
+    monitor.register("database", _fail)
+    asyncio.run(monitor.run_once())
+    assert monitor.snapshot()["status"] == "not_ready"
+
+def test_stale_results_are_not_ready():
+    monitor = HealthMonitor(interval=5, timeout=1)
+    monitor.register("database", _ok)
+    asyncio.run(monitor.run_once())
+    monitor._results["database"].checked_at -= 60
+    snapshot = monitor.snapshot()
+    assert snapshot["ready"] is False
+    assert snapshot["checks"]["database"]["stale"] is True
+
+def test_ready_endpoint_serves_cached_status(monkeypatch):
+    calls = []
+
+    async def database():
+        calls.append(1)
+
+    monitor = HealthMonitor(interval=5, timeout=1)
+    monitor.register("database", database)
+    monkeypatch.setattr("app.api.endpoints.root.health_monitor", monitor)
+    client = TestClient(app)
+
+    assert client.get("/api/ready").status_code == 503
+    asyncio.run(monitor.run_once())
+    for _ in range(3):
+        response = client.get("/api/ready")
+        assert response.status_code == 200
+    # Пробы не обращаются к зависимостям
+    assert len(calls) == 1
+
+def test_draining_worker_is_not_ready(monkeypatch, tmp_path):
+    flag = tmp_path / "draining"
+    monkeypatch.setattr(settings, "SHUTDOWN_DRAIN_FLAG_FILE", str(flag))
+    monitor = HealthMonitor(interval=5, timeout=1)
+    monitor.register("database", _ok)
+    asyncio.run(monitor.run_once())
+    assert monitor.snapshot()["ready"] is True
+
+    # Файл-флаг создаёт entrypoint.sh по SIGTERM
+    flag.touch()
+    assert monitor.snapshot()["status"] == "draining"
+    assert monitor.snapshot()["ready"] is False
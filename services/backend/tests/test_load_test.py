@@ -0,0 +1,51 @@
+import asyncio
+
+import httpx
+
+from benchmarks.load_test import LoadTest, compare, percentile
+
+def fake_backend(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path in ("/api/auth/register", "/api/auth/login", "/api/auth/refresh"):
+        return httpx.Response(200, json={"token_type": "bearer"}, headers={"set-cookie": "access_token=t; Path=/"})
+    if path == "/api/auth/me":
+        if "access_token=t" not in request.headers.get("cookie", ""):
+            return httpx.Response(401)
+        return httpx.Response(200, json={"id": 1})
+    if path == "/api/admin/users":
+        return httpx.Response(200 if request.headers.get("authorization") == "Bearer t" else 403)
+    return httpx.Response(404)
+
+def test_percentile_uses_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+def test_scenarios_report_latency_percentiles():
+    test = LoadTest("http://backend", 3, "http://localhost:3000", "admin@example.com", "secret",
+                    transport=httpx.MockTransport(fake_backend))
+    results = asyncio.run(test.run(["login", "me", "admin_search"], duration=0.2, warmup=0.05))
+
+    assert set(results) == {"login", "me", "admin_search"}
+    for summary in results.values():
+        assert summary["requests"] > 0 and summary["rps"] > 0
+        assert summary["error_rate"] == 0.0
+        assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+        assert summary["status_counts"] == {"200": summary["requests"]}
+
+def test_admin_scenarios_are_skipped_without_credentials():
+    test = LoadTest("http://backend", 1, "http://localhost:3000", None, None,
+                    transport=httpx.MockTransport(fake_backend))
+    assert asyncio.run(test.run(["admin_list"], duration=0.05, warmup=0)) == {}
+
+def test_compare_flags_throughput_latency_and_error_regressions():
+    base = {"rps": 100.0, "p95_ms": 20.0, "p99_ms": 40.0, "error_rate": 0.0}
+    baseline = {"scenarios": {"login": base, "me": base}}
+    results = {"scenarios": {
+        "login": {"rps": 90.0, "p95_ms": 23.0, "p99_ms": 47.0, "error_rate": 0.005},
+        "me": {"rps": 70.0, "p95_ms": 30.0, "p99_ms": 40.0, "error_rate": 0.05},
+    }}
+    regressions = compare(results, baseline, tolerance=0.2)
+    assert not any(r.startswith("login") for r in regressions)
+    assert [r.split(" ")[1] for r in regressions] == ["rps", "p95_ms", "error_rate"]
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.login_shield import CHECK_SCRIPT, HashBudget, LoginShield, subnet_of
+
+class _FakeShieldClient:
+    """Исполняет скрипты LoginShield в памяти; время блокировок не идёт."""
+    def __init__(self):
+        self.counters = {}
+        self.blocks = {}
+        self.calls = 0
+
+    def register_script(self, script):
+        async def check(keys, args=()):
+            self.calls += 1
+            return max([self.blocks.get(key, 0) for key in keys] + [0])
+
+        async def failure(keys, args):
+            self.calls += 1
+            base, cap = int(args[1]), int(args[2])
+            result = 0
+            for pair in range(len(keys) // 2):
+                counter, block = keys[2 * pair], keys[2 * pair + 1]
+                self.counters[counter] = self.counters.get(counter, 0) + 1
+                over = self.counters[counter] - int(args[3 + pair])
+                if over > 0:
+                    delay = min(base * 2 ** (over - 1), cap)
+                    self.blocks[block] = delay
+                    result = max(result, delay)
+            return result
+
+        return check if script == CHECK_SCRIPT else failure
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.counters.pop(key, None)
+            self.blocks.pop(key, None)
+
+def test_subnet_grouping():
+    assert subnet_of("203.0.113.7") == subnet_of("203.0.113.200") == "203.0.113.0/24"
+    assert subnet_of("2001:db8::1") == "2001:db8::/64"
+    assert subnet_of("unknown") == "unknown"
+
+def test_account_is_blocked_with_growing_delay():
+    client = _FakeShieldClient()
+    shield = LoginShield(client)
+    free = settings.LOGIN_SHIELD_ACCOUNT_FREE_FAILURES
+
+    async def scenario():
+        for _ in range(free):
+            await shield.check("Victim@example.com", "198.51.100.1")
+            await shield.record_failure("victim@example.com", "198.51.100.1")
+        await shield.record_failure("victim@example.com", "198.51.100.1")
+        first = max(client.blocks.values())
+        await shield.record_failure("victim@example.com", "198.51.100.1")
+        assert max(client.blocks.values()) == 2 * first
+
+        # Другой адрес не помогает: аккаунт заблокирован без хеширования пароля
+        with pytest.raises(HTTPException) as exc:
+            await shield.check("victim@example.com", "192.0.2.10")
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+
+        await shield.record_success("victim@example.com", "192.0.2.10")
+        await shield.check("victim@example.com", "192.0.2.10")
+
+    asyncio.run(scenario())
+
+def test_hash_budget_is_bounded():
+    budget = HashBudget(rate=0.001, capacity=3)
+    assert [budget.take() for _ in range(5)] == [True, True, True, False, False]
+
+def test_exhausted_hash_budget_does_not_reveal_accounts(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.api.endpoints import auth
+    from app.db.queries import UserRow
+    from app.db.session import get_db
+    from app.main import app
+
+    shield = LoginShield(_FakeShieldClient())
+    shield.hash_budget = HashBudget(rate=0.001, capacity=0)
+    monkeypatch.setattr(auth, "login_shield", shield)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    lookups = []
+
+    async def get_user_by_email(db, email):
+        lookups.append(email)
+        if email == "alice@example.com":
+            return UserRow(id=1, username="alice", email=email, hashed_password="x",
+                           role_id=None, is_active=True, role_obj=None)
+        return None
+
+    monkeypatch.setattr(auth.queries, "get_user_by_email", get_user_by_email)
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        client = TestClient(app)
+        responses = [
+            client.post("/api/auth/login", data={"username": email, "password": "secret"})
+            for email in ("alice@example.com", "nobody@example.com")
+        ]
+    finally:
+        app.dependency_overrides.clear()
+    # Отказ одинаков и наступает до поиска пользователя
+    assert [r.status_code for r in responses] == [503, 503]
+    assert responses[0].json() == responses[1].json()
+    assert lookups == []
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+from app.core.loop_monitor import LoopLagMonitor, loop_lag
+from app.core.metrics import Histogram
+
+def blocking_call():
+    time.sleep(0.3)
+
+def test_blocking_call_is_measured_and_its_stack_captured():
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.1)
+    observed = loop_lag.get()
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    assert loop_lag.get() > observed
+    assert monitor.last_stack is not None and "blocking_call" in monitor.last_stack
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("lag_seconds", "lag", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    samples = {(name, key): value for name, key, value in histogram.samples()}
+    assert samples[("lag_seconds_bucket", ("0.1",))] == 1
+    assert samples[("lag_seconds_bucket", ("1.0",))] == 2
+    assert samples[("lag_seconds_bucket", ("+Inf",))] == 3
+    assert samples[("lag_seconds_count", ())] == 3
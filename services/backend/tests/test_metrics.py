@@ -0,0 +1,15 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+def test_metrics_require_the_scrape_token_when_configured(monkeypatch):
+    client = TestClient(app)
+    assert client.get("/api/metrics").status_code == 200
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "# TYPE" in response.text
@@ -0,0 +1,30 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.openapi import OpenAPIArtifact, render_schema, route_signature, schema_signature
+from app.main import app
+
+client = TestClient(app)
+
+def test_schema_is_served_with_etag_and_gzip():
+    response = client.get("/api/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert schema_signature(response.json()) == route_signature(app)
+
+    etag = response.headers["etag"]
+    assert client.get("/api/openapi.json", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/docs", headers={"If-None-Match": etag}).status_code == 200
+
+def test_artifact_is_reused_only_when_it_matches_routes(tmp_path):
+    path = tmp_path / "openapi.json"
+    OpenAPIArtifact(app, str(path)).asset
+    # Первый воркер сохраняет артефакт для остальных
+    assert path.read_bytes() == render_schema(app)
+
+    schema = json.loads(path.read_bytes())
+    schema["paths"]["/api/removed"] = {"get": {}}
+    path.write_text(json.dumps(schema))
+    asset = OpenAPIArtifact(app, str(path)).asset
+    assert schema_signature(json.loads(asset.body)) == route_signature(app)
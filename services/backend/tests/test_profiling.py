@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core.profiling import collapsed, cpu_profiler, speedscope
+from app.main import app
+
+def hot_function():
+    total = 0
+    for i in range(20000):
+        total += i * i
+    return total
+
+async def busy_loop(stop):
+    while not stop.is_set():
+        hot_function()
+        await asyncio.sleep(0)
+
+def test_sampler_sees_cpu_bound_code_on_the_loop():
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(busy_loop(stop))
+        samples, total = await cpu_profiler.profile(0.3, rate=200)
+        stop.set()
+        await task
+        return samples, total
+
+    samples, total = asyncio.run(scenario())
+    assert total > 10
+    assert "hot_function (" in collapsed(samples)
+
+    profile = speedscope(samples, "test", rate=200)
+    frames = profile["shared"]["frames"]
+    assert any(frame["name"] == "hot_function" for frame in frames)
+    assert len(profile["profiles"][0]["samples"]) == len(profile["profiles"][0]["weights"])
+
+def test_profile_endpoint_is_admin_only_and_labels_worker():
+    client = TestClient(app)
+    assert client.get("/api/admin/debug/profile/cpu", params={"seconds": 0.1}).status_code == 401
+
+    app.dependency_overrides[deps.get_current_active_admin] = lambda: None
+    try:
+        response = client.get("/api/admin/debug/profile/cpu", params={"seconds": 0.1, "format": "speedscope"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["x-worker-id"] == str(os.getpid())
+    assert response.json()["profiles"][0]["type"] == "sampled"
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.core import ratelimit
+from app.core.ratelimit import DENY, HybridRateLimiter, RateLimitExceeded, Rule
+
+class _FakeScriptClient:
+    """Исполняет LEASE_SCRIPT в памяти и считает обращения к «Redis»."""
+    def __init__(self):
+        self.data = {}
+        self.calls = 0
+        self.fail = False
+        self.delay = False
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls += 1
+            if self.delay:
+                await asyncio.sleep(0)
+            if self.fail:
+                raise ConnectionError("redis is down")
+            limit, weight, want = int(args[0]), float(args[1]), int(args[2])
+            available = limit - int(self.data.get(keys[1], 0) * weight) - self.data.get(keys[0], 0)
+            if available <= 0:
+                return 0
+            grant = min(want, available)
+            self.data[keys[0]] = self.data.get(keys[0], 0) + grant
+            return grant
+        return run
+
+def _request(ip="10.0.0.1"):
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": (ip, 1234)})
+
+def test_tokens_are_leased_in_batches():
+    client = _FakeScriptClient()
+    limiter = HybridRateLimiter(client, {"api": (Rule("ip", limit=100, window=60, lease=10),)})
+
+    async def scenario():
+        for _ in range(25):
+            await limiter.check("api", _request())
+
+    asyncio.run(scenario())
+    # 25 запросов — три аренды по 10 токенов вместо 25 обращений к Redis
+    assert client.calls == 3
+
+def test_denial_is_cached_locally():
+    client = _FakeScriptClient()
+    limiter = HybridRateLimiter(client, {"login": (Rule("ip", limit=3, window=60, lease=1),)})
+
+    async def scenario():
+        for _ in range(3):
+            await limiter.check("login", _request())
+        for _ in range(5):
+            with pytest.raises(RateLimitExceeded) as exc:
+                await limiter.check("login", _request())
+            assert exc.value.retry_after > 0
+        # Другой IP ограничивается независимо
+        await limiter.check("login", _request("10.0.0.2"))
+
+    asyncio.run(scenario())
+    # 3 успешные аренды + одна неудачная, остальные отказы из локального кэша + новый IP
+    assert client.calls == 5
+
+def test_contended_lease_is_retried_while_redis_has_capacity():
+    client = _FakeScriptClient()
+    client.delay = True
+    limiter = HybridRateLimiter(client, {"api": (Rule("ip", limit=20, window=60, lease=1),)})
+
+    async def scenario():
+        # Токен каждой аренды достаётся одному из ожидающих, остальные арендуют снова
+        await asyncio.gather(*(limiter.check("api", _request()) for _ in range(20)))
+        with pytest.raises(RateLimitExceeded):
+            await limiter.check("api", _request())
+
+    asyncio.run(scenario())
+
+def test_bucket_count_is_capped_within_the_window():
+    client = _FakeScriptClient()
+    limiter = HybridRateLimiter(client, {"login": (Rule("ip", limit=5, window=900),)}, max_buckets=100)
+
+    async def scenario():
+        # Новый адрес на каждый запрос в пределах одного окна: устаревших корзин нет
+        for n in range(1000):
+            await limiter.check("login", _request(f"10.0.{n // 256}.{n % 256}"))
+            assert len(limiter._buckets) <= 100
+
+    asyncio.run(scenario())
+
+def test_local_fallback_when_redis_is_down():
+    client = _FakeScriptClient()
+    client.fail = True
+    limiter = HybridRateLimiter(client, {
+        "login": (Rule("ip", limit=2, window=60),),
+        "strict": (Rule("ip", limit=2, window=60, on_redis_error=DENY),),
+    })
+
+    async def scenario():
+        await limiter.check("login", _request())
+        await limiter.check("login", _request())
+        with pytest.raises(RateLimitExceeded):
+            await limiter.check("login", _request())
+        with pytest.raises(RateLimitExceeded) as exc:
+            await limiter.check("strict", _request())
+        assert exc.value.unavailable
+
+    asyncio.run(scenario())
+
+def test_dependency_returns_429_with_retry_after(monkeypatch):
+    client = _FakeScriptClient()
+    monkeypatch.setattr(ratelimit, "limiter", HybridRateLimiter(client, ratelimit.RATE_LIMITS))
+    dependency = ratelimit.rate_limit("refresh")
+    limit = ratelimit.RATE_LIMITS["refresh"][0].limit
+
+    async def scenario():
+        for _ in range(limit):
+            await dependency(_request())
+        with pytest.raises(HTTPException) as exc:
+            await dependency(_request())
+        return exc.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+
+def test_unknown_route_is_rejected_at_import_time():
+    with pytest.raises(KeyError):
+        ratelimit.rate_limit("no-such-route")
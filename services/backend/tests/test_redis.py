@@ -28,3 +28,165 @@ def test_redis_check_failure(mock_ping):
     assert data["status"] == "error"
     assert "Connection error" in data["message"]
     mock_ping.assert_called_once()
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def exists(self, key):
+        self.commands.append(("exists", key))
+
+    def get(self, key):
+        self.commands.append(("get", key))
+
+    def mget(self, keys):
+        self.commands.append(("mget", keys))
+
+    async def execute(self, raise_on_error=True):
+        self.client.round_trips += 1
+        results = []
+        for name, key in self.commands:
+            if name == "exists":
+                results.append(self.client.data.get(key, 0))
+            elif name == "mget":
+                results.append([self.client.data.get(k) for k in key])
+            else:
+                results.append(self.client.data.get(key))
+        return results
+
+class _FakeClient:
+    def __init__(self, data):
+        self.data = data
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def exists(self, key):
+        self.round_trips += 1
+        return self.data.get(key, 0)
+
+def test_redis_batch_pipelines_concurrent_commands():
+    import asyncio
+    from app.core.redis import RedisBatch
+
+    client = _FakeClient({"denylist:a": 1, "version": "3"})
+    batch = RedisBatch(client)
+
+    async def main():
+        return await asyncio.gather(batch.exists("denylist:a"), batch.exists("denylist:b"), batch.get("version"))
+
+    assert asyncio.run(main()) == [1, 0, "3"]
+    assert client.round_trips == 1
+
+def test_me_checks_denylist_and_versions_in_one_round_trip(monkeypatch):
+    from app.api import deps
+    from app.core import security
+    from app.core.redis import RedisBatch, get_redis_batch
+    from app.db.queries import UserRow
+
+    async def load_user(user_id):
+        return UserRow(id=user_id, username="alice", email="alice@example.com",
+                       hashed_password="x", role_id=None, is_active=True, role_obj=None)
+
+    monkeypatch.setattr(deps, "_load_user", load_user)
+    redis = _FakeClient({"version:user:7": "stamp"})
+    app.dependency_overrides[get_redis_batch] = lambda: RedisBatch(redis)
+    # Токен с jti: проверка denylist (EXISTS) и метка версии (MGET)
+    token = security.create_refresh_token(7)
+    try:
+        response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200 and "etag" in response.headers
+    assert redis.round_trips == 1
+
+def test_client_cache_invalidation():
+    import asyncio
+    from app.core.redis_cache import ClientSideCache
+
+    cache = ClientSideCache({}, prefixes=["denylist:"])
+    cache._ready = True
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        return 0
+
+    async def main():
+        await cache.get_or_load("denylist:x", loader)
+        await cache.get_or_load("denylist:x", loader)
+        assert loads == 1
+        # Сервер сообщил об изменении ключа — следующее чтение идёт в Redis
+        await cache._on_invalidate(["invalidate", ["denylist:x"]])
+        await cache.get_or_load("denylist:x", loader)
+        assert loads == 2
+        # Ключи вне отслеживаемых префиксов не кэшируются
+        await cache.get_or_load("other:x", loader)
+        await cache.get_or_load("other:x", loader)
+        assert loads == 4
+
+    asyncio.run(main())
+
+def test_local_replica_is_tried_first():
+    import asyncio
+    from redis.asyncio.sentinel import SlaveNotFoundError
+    from app.core.redis import LocalReplicaFirstPool
+
+    class FakeSentinel:
+        async def discover_slaves(self, service_name):
+            return [("10.0.0.2", 6379), ("10.0.0.3", 6379)]
+
+        async def discover_master(self, service_name):
+            return ("10.0.0.1", 6379)
+
+    pool = LocalReplicaFirstPool("mymaster", FakeSentinel(), local_address=("10.0.0.3", 6379), is_master=False)
+
+    async def main():
+        addresses = []
+        try:
+            async for address in pool.rotate_slaves():
+                addresses.append(address)
+        except SlaveNotFoundError:
+            pass
+        return addresses
+
+    addresses = asyncio.run(main())
+    # Локальная реплика первой, затем остальные реплики без повторов, мастер последним
+    assert addresses[0] == ("10.0.0.3", 6379)
+    assert addresses.count(("10.0.0.3", 6379)) == 1
+    assert addresses[-1] == ("10.0.0.1", 6379)
+    assert set(addresses) == {("10.0.0.1", 6379), ("10.0.0.2", 6379), ("10.0.0.3", 6379)}
+
+def test_sentinel_pools_keep_the_connection_bound():
+    from redis.asyncio.sentinel import Sentinel
+    from app.core.redis import BlockingSentinelPool, LocalReplicaFirstPool
+
+    sentinel = Sentinel([("127.0.0.1", 26379)], max_connections=7)
+    master = sentinel.master_for("mymaster", connection_pool_class=BlockingSentinelPool, timeout=0.5)
+    replica = sentinel.slave_for("mymaster", connection_pool_class=LocalReplicaFirstPool, timeout=0.5)
+    for pool in (master.connection_pool, replica.connection_pool):
+        assert pool.max_connections == 7
+        assert pool.timeout == 0.5
+        assert "timeout" not in pool.connection_kwargs
+
+def test_local_replica_host_resolves_the_container_gateway(tmp_path):
+    from app.core import redis as redis_module
+
+    route = tmp_path / "route"
+    route.write_text(
+        "Iface\tDestination\tGateway\tFlags\tRefCnt\tUse\tMetric\tMask\n"
+        "eth0\t000012AC\t00000000\t0001\t0\t0\t0\t0000FFFF\n"
+        "eth1\t00000000\t010012AC\t0003\t0\t0\t0\t00000000\n"
+    )
+    assert redis_module.default_gateway(str(route)) == "172.18.0.1"
+    assert redis_module.local_replica_host("10.0.0.5") == "10.0.0.5"
+    assert redis_module.local_replica_host("") is None
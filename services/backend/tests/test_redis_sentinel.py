@@ -0,0 +1,58 @@
+"""Интеграционный тест режима Sentinel.
+
+Запускается на локальной топологии из docker-compose.sentinel.yml (make sentinel-test);
+без REDIS_SENTINELS в окружении пропускается.
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.core import redis as app_redis
+
+pytestmark = pytest.mark.skipif(not settings.REDIS_SENTINELS, reason="REDIS_SENTINELS is not configured")
+
+async def _eventually(check, timeout: float = 30.0, interval: float = 0.5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        try:
+            if await check():
+                return
+        except Exception:
+            pass
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(interval)
+
+async def _scenario():
+    master_name = settings.REDIS_SENTINEL_MASTER
+    key = f"sentinel-test:{uuid.uuid4().hex}"
+
+    # Запись идёт в мастер, чтение — из реплики
+    assert (await app_redis.redis_client.execute_command("ROLE"))[0] == "master"
+    await app_redis.redis_client.set(key, "1", ex=60)
+    if settings.REDIS_READ_FROM_REPLICAS:
+        assert (await app_redis.redis_read_client.execute_command("ROLE"))[0] == "slave"
+        await _eventually(lambda: app_redis.redis_read_client.exists(key))
+
+    # Ручной failover: клиент должен сам найти нового мастера
+    old_master = await app_redis.sentinel.discover_master(master_name)
+    await app_redis.sentinel.execute_command("SENTINEL FAILOVER", master_name, once=True)
+
+    async def master_changed():
+        return await app_redis.sentinel.discover_master(master_name) != old_master
+
+    await _eventually(master_changed)
+
+    async def write_succeeds():
+        app_redis.redis_breaker.reset()
+        return await app_redis.redis_client.set(key, "2", ex=60)
+
+    await _eventually(write_succeeds)
+    assert await app_redis.redis_client.get(key) == "2"
+    await app_redis.redis_client.aclose()
+    await app_redis.redis_read_client.aclose()
+
+def test_sentinel_failover_and_replica_reads():
+    asyncio.run(_scenario())
@@ -0,0 +1,41 @@
+import signal
+
+from app.core import runtime
+from app.core.runtime import MemoryWatchdog, cgroup_cpu_quota, worker_count
+
+def test_cpu_quota_from_cgroup_v2_and_v1(tmp_path):
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    (v2 / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_quota(str(v2)) == 1.5
+    (v2 / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_quota(str(v2)) is None
+
+    v1 = tmp_path / "v1" / "cpu"
+    v1.mkdir(parents=True)
+    (v1 / "cpu.cfs_quota_us").write_text("300000")
+    (v1 / "cpu.cfs_period_us").write_text("100000")
+    assert cgroup_cpu_quota(str(tmp_path / "v1")) == 3.0
+    (v1 / "cpu.cfs_quota_us").write_text("-1")
+    assert cgroup_cpu_quota(str(tmp_path / "v1")) is None
+
+def test_worker_count_follows_quota_within_bounds(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime.os, "sched_getaffinity", lambda pid: set(range(16)))
+    (tmp_path / "cpu.max").write_text("250000 100000")
+    assert worker_count(root=str(tmp_path)) == 3
+    (tmp_path / "cpu.max").write_text("50000 100000")
+    assert worker_count(root=str(tmp_path)) == 2
+    (tmp_path / "cpu.max").write_text("max 100000")
+    assert worker_count(root=str(tmp_path)) == 8
+
+def test_watchdog_asks_for_graceful_restart_above_watermark(monkeypatch):
+    signals = []
+    monkeypatch.setattr(runtime.os, "kill", lambda pid, sig: signals.append(sig))
+    watchdog = MemoryWatchdog(max_uss_bytes=100 * 2**20)
+
+    # Общие с мастером страницы в RSS не считаются
+    monkeypatch.setattr(runtime, "memory_usage", lambda: {"rss": 300 * 2**20, "uss": 50 * 2**20})
+    assert not watchdog.check() and signals == []
+
+    monkeypatch.setattr(runtime, "memory_usage", lambda: {"rss": 400 * 2**20, "uss": 150 * 2**20})
+    assert watchdog.check() and signals == [signal.SIGTERM]
@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.core.serialization import dump_json
+from app.db.queries import RoleRow, UserRow
+from app.main import app
+from app.models.role import Role
+from app.models.user import User
+from app.schemas.token import TokenPayload
+from app.schemas.user import User as UserSchema, UserList
+
+def _row(role=True):
+    return UserRow(
+        id=7, username="alice", email="alice@example.com", hashed_password="secret-hash",
+        role_id=2 if role else None, is_active=True,
+        role_obj=RoleRow(id=2, name="admin", description="Administrators") if role else None,
+    )
+
+def test_me_endpoint_matches_user_schema(monkeypatch):
+    async def no_etag(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr("app.api.endpoints.auth.versions.etag", no_etag)
+    for row in (_row(), _row(role=False)):
+        async def load_user(user_id, row=row):
+            return row
+
+        monkeypatch.setattr(deps, "_load_user", load_user)
+        app.dependency_overrides[deps.get_token_payload] = lambda: TokenPayload(sub=row.id)
+        try:
+            response = TestClient(app).get("/api/auth/me")
+        finally:
+            app.dependency_overrides.clear()
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert "hashed_password" not in response.json()
+        assert response.json() == UserSchema.model_validate(row).model_dump(mode="json")
+
+def test_user_list_matches_orm_serialization():
+    users = [
+        User(id=1, username="a", email="a@example.com", hashed_password="x", role_id=2, is_active=True,
+             role_obj=Role(id=2, name="admin", description=None)),
+        User(id=2, username="b", email="b@example.com", hashed_password="x", role_id=None, is_active=False),
+    ]
+    # Строки, как их возвращает запрос столбцов в read_users
+    rows = [SimpleNamespace(**u.serialization()) for u in users]
+    body = dump_json(UserList, {"users": rows, "total": 2}, from_attributes=True)
+    assert json.loads(body) == {"users": [u.serialization() for u in users], "total": 2}
@@ -0,0 +1,55 @@
+import multiprocessing
+
+from app.core.shm_cache import FILE_HEADER_SIZE, SLOT_HEADER, SharedMemoryCache
+
+def _open(path, **kwargs):
+    cache = SharedMemoryCache(str(path), **{"slots": 8, "slot_size": 256, **kwargs})
+    cache.open()
+    return cache
+
+def _store(path, key, value):
+    _open(path).set(key, value, ttl=60)
+
+def test_values_are_shared_between_processes(tmp_path):
+    path = tmp_path / "cache"
+    cache = _open(path)
+    process = multiprocessing.get_context("fork").Process(target=_store, args=(path, "page:1", b'{"users":[]}'))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert cache.get("page:1") == b'{"users":[]}'
+    assert cache.get("page:2") is None
+
+def test_expiry_oversize_delete_and_eviction(tmp_path):
+    cache = _open(tmp_path / "cache", slots=1)
+    assert cache.set("a", b"1", ttl=-1)
+    assert cache.get("a") is None
+
+    assert not cache.set("big", b"x" * 256, ttl=60)
+
+    cache.set("a", b"1", ttl=60)
+    cache.delete("a")
+    assert cache.get("a") is None
+
+    # Одна ячейка: новая запись вытесняет старую, чужой ключ не возвращается
+    cache.set("a", b"1", ttl=60)
+    cache.set("b", b"2", ttl=60)
+    assert cache.get("a") is None and cache.get("b") == b"2"
+
+def test_torn_or_foreign_data_is_a_miss(tmp_path):
+    path = tmp_path / "cache"
+    cache = _open(path, slots=1)
+    cache.set("key", b"value", ttl=60)
+    # Повреждённое значение (например, недописанное) не проходит проверку CRC
+    cache._mm[FILE_HEADER_SIZE + SLOT_HEADER.size + len("key")] ^= 0xFF
+    assert cache.get("key") is None
+
+    # Другая разметка таблицы: файл переинициализируется, старые записи не читаются
+    cache.set("key", b"value", ttl=60)
+    assert _open(path, slots=2).get("key") is None
+
+def test_unavailable_path_disables_cache(tmp_path):
+    cache = _open(tmp_path / "missing" / "cache")
+    assert not cache.ready
+    assert cache.get("key") is None
+    assert not cache.set("key", b"value", ttl=60)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.core import deadline
+from app.core.deadline import DeadlineExceeded
+from app.core.singleflight import SingleFlight, singleflight_merged
+
+def test_concurrent_calls_are_merged():
+    group = SingleFlight("test_merge")
+    calls = 0
+
+    async def lookup():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def main():
+        return await asyncio.gather(*(group.do(1, lookup) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(r == {"id": 1} for r in results)
+    assert singleflight_merged.get(group="test_merge") == 9
+    assert group.in_flight() == 0
+
+def test_error_is_propagated_to_all_waiters():
+    group = SingleFlight("test_error")
+
+    async def lookup():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(group.do("k", lookup) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert group.in_flight() == 0
+
+def test_cancelling_one_waiter_keeps_shared_call():
+    group = SingleFlight("test_cancel")
+
+    async def lookup():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        first = asyncio.ensure_future(group.do("k", lookup))
+        second = asyncio.ensure_future(group.do("k", lookup))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "ok"
+
+def test_last_waiter_cancellation_cancels_call():
+    group = SingleFlight("test_cancel_last")
+    finished = False
+
+    async def lookup():
+        nonlocal finished
+        await asyncio.sleep(0.05)
+        finished = True
+
+    async def main():
+        waiter = asyncio.ensure_future(group.do("k", lookup))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.1)
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+    assert finished is False
+
+def test_shared_call_does_not_inherit_the_first_callers_deadline():
+    group = SingleFlight("test_deadline")
+    seen = []
+
+    async def lookup():
+        seen.append(deadline.remaining())
+        async with deadline.bounded("redis"):
+            await asyncio.sleep(0.05)
+        return "user"
+
+    async def waiter(budget):
+        token = deadline.set_deadline(budget)
+        try:
+            async with deadline.bounded("request"):
+                return await group.do("k", lookup)
+        finally:
+            deadline.reset_deadline(token)
+
+    async def main():
+        first = asyncio.create_task(waiter(0.01))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter(1.0))
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    # Короткий бюджет первого вызвавшего обрывает только его ожидание
+    assert isinstance(first, DeadlineExceeded)
+    assert second == "user"
+    assert seen == [None]
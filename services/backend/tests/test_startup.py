@@ -0,0 +1,26 @@
+import asyncio
+
+from app.core import startup
+from app.core.startup import StartupProfiler
+
+def test_warm_up_survives_unavailable_dependencies(monkeypatch):
+    profiler = StartupProfiler(enabled=True)
+    monkeypatch.setattr(startup, "startup_profiler", profiler)
+    monkeypatch.setattr(startup.settings, "STARTUP_WARMUP_TIMEOUT", 0.05)
+
+    async def refused():
+        raise ConnectionError("connection refused")
+
+    async def hanging():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(startup, "_warm_database", refused)
+    monkeypatch.setattr(startup, "_warm_redis", hanging)
+
+    asyncio.run(startup.warm_up())
+
+    phases = dict(profiler.phases)
+    assert set(phases) == {"warm_up.password_hashing", "warm_up.database", "warm_up.redis"}
+    # Зависший шаг ограничен таймаутом и не задерживает запуск
+    assert phases["warm_up.redis"] < 1
+    assert "warm_up.redis" in profiler.report()
@@ -0,0 +1,92 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core import security, tracing
+from app.core.tracing import TraceExporter, span
+from app.main import app
+
+def test_spans_are_recorded_only_inside_a_trace():
+    with span("hash"):
+        pass
+    assert tracing.current() is None
+
+    token = tracing.start_trace()
+    try:
+        trace = tracing.current()
+        security.create_access_token("1")
+        security.decode_token(security.create_access_token("1"))
+        with span("redis", "GET"):
+            pass
+    finally:
+        tracing.end_trace(token)
+
+    assert trace.counts == {"jwt": 3, "redis": 1}
+    header = trace.server_timing()
+    assert header.startswith('jwt;dur=') and '"3x"' in header and header.split(", ")[-1].startswith("total;dur=")
+    assert "jwt=" in trace.summary()
+    assert [s["name"] for s in trace.to_dict()["spans"]] == ["encode", "encode", "decode", "GET"]
+
+def test_sqlalchemy_statements_become_db_spans():
+    engine = create_engine("sqlite://")
+    tracing.instrument_engine(engine)
+    token = tracing.start_trace()
+    try:
+        trace = tracing.current()
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+    finally:
+        tracing.end_trace(token)
+    assert trace.counts["db"] == 1
+    assert trace.spans[0][:2] == ("db", "SELECT")
+
+def test_server_timing_is_off_by_default():
+    response = TestClient(app).get("/api/health")
+    assert "server-timing" not in response.headers
+
+def test_response_has_server_timing_with_request_breakdown(monkeypatch):
+    monkeypatch.setattr(tracing.settings, "SERVER_TIMING_ENABLED", True)
+    client = TestClient(app)
+    token = security.create_access_token("1")
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    timing = response.headers["server-timing"]
+    assert "jwt;dur=" in timing
+    assert "total;dur=" in timing
+
+def test_hash_timing_is_never_sent_on_auth_routes():
+    token = tracing.start_trace()
+    try:
+        trace = tracing.current()
+        with span("hash", "verify"):
+            pass
+        with span("db", "SELECT"):
+            pass
+    finally:
+        tracing.end_trace(token)
+    # По наличию hash в ответе на вход видно, существует ли аккаунт
+    header = trace.server_timing(hidden=tracing.hidden_categories("/api/auth/login"))
+    assert "hash" not in header and "db;dur=" in header
+    assert "hash;dur=" in trace.server_timing(hidden=tracing.hidden_categories("/api/admin/users"))
+
+def test_slow_traces_are_exported_as_json_lines(tmp_path, monkeypatch):
+    exporter = TraceExporter(str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "exporter", exporter)
+    monkeypatch.setattr(tracing.settings, "TRACE_SAMPLE_RATE", 0)
+
+    token = tracing.start_trace()
+    try:
+        trace = tracing.current()
+        with span("hash", "verify"):
+            pass
+    finally:
+        tracing.end_trace(token)
+    tracing.finish(trace, slow=True, path="/api/auth/login", status=200)
+    tracing.finish(trace, slow=False, path="/api/auth/login", status=200)
+    exporter.close()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    exported = json.loads(lines[0])
+    assert exported["path"] == "/api/auth/login"
+    assert exported["spans"][0]["category"] == "hash"
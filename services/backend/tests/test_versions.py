@@ -0,0 +1,197 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.api import deps
+from app.api.endpoints import admin
+from app.core.redis import RedisBatch, get_redis_batch
+from app.core.result_cache import ResultCache
+from app.core.versions import USERS, VersionStamps, user_scope
+from app.db.queries import RoleRow, UserRow
+from app.db.session import get_db
+from app.main import app
+from app.schemas.token import TokenPayload
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    async def mget(self, keys):
+        if self.down:
+            raise ConnectionError("redis is down")
+        return [self.data.get(key) for key in keys]
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def set(self, *args, **kwargs):
+                self.commands.append((args, kwargs))
+
+            async def execute(self):
+                if redis.down:
+                    raise ConnectionError("redis is down")
+                for args, kwargs in self.commands:
+                    await redis.set(*args, **kwargs)
+
+        return Pipeline()
+
+def _row():
+    return UserRow(
+        id=7, username="alice", email="alice@example.com", hashed_password="x",
+        role_id=None, is_active=True, role_obj=None,
+    )
+
+def test_me_answers_304_after_checking_the_user(monkeypatch):
+    redis = FakeRedis()
+    stamps = VersionStamps(redis)
+    monkeypatch.setattr("app.api.endpoints.auth.versions", stamps)
+    loads = []
+
+    async def load_user(user_id):
+        loads.append(user_id)
+        return _row()
+
+    monkeypatch.setattr(deps, "_load_user", load_user)
+    app.dependency_overrides[deps.get_token_payload] = lambda: TokenPayload(sub=7)
+    app.dependency_overrides[get_redis_batch] = lambda: RedisBatch(redis)
+    client = TestClient(app)
+    try:
+        first = client.get("/api/auth/me")
+        etag = first.headers["etag"]
+        assert first.status_code == 200 and loads == [7]
+
+        cached = client.get("/api/auth/me", headers={"If-None-Match": f"W/{etag}"})
+        assert cached.status_code == 304 and cached.headers["etag"] == etag
+        # 304 только после проверки пользователя: тело не строится, но доступ проверен
+        assert loads == [7, 7]
+
+        # Запись меняет метку: прежний ETag больше не совпадает
+        asyncio.run(stamps.bump(user_scope(7), USERS))
+        changed = client.get("/api/auth/me", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+        # Без Redis условный запрос не обрабатывается, ответ полный
+        redis.down = True
+        degraded = client.get("/api/auth/me", headers={"If-None-Match": etag})
+        assert degraded.status_code == 200 and "etag" not in degraded.headers
+    finally:
+        app.dependency_overrides.clear()
+
+def test_lost_stamp_never_repeats_previous_value():
+    redis = FakeRedis()
+    stamps = VersionStamps(redis)
+    first = asyncio.run(stamps.etag([USERS], "page", 1))
+    redis.data.clear()
+    assert asyncio.run(stamps.etag([USERS], "page", 1)) != first
+    assert asyncio.run(stamps.etag([USERS], "page", 1)) == asyncio.run(stamps.etag([USERS], "page", 1))
+
+class FakeSession:
+    def __init__(self):
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        row = SimpleNamespace(id=1, username="bob", email="bob@example.com", role_name="user", role_id=1, is_active=True)
+        return SimpleNamespace(scalar=lambda: 1, all=lambda: [row])
+
+def test_admin_pages_are_served_from_versioned_cache(monkeypatch):
+    redis = FakeRedis()
+    stamps = VersionStamps(redis)
+    session = FakeSession()
+    monkeypatch.setattr(admin, "versions", stamps)
+    monkeypatch.setattr(admin, "users_page_cache", ResultCache("admin_users", redis))
+
+    async def load_admin(user_id):
+        return UserRow(
+            id=1, username="root", email="root@example.com", hashed_password="x", role_id=2,
+            is_active=True, role_obj=RoleRow(id=2, name="admin", description=None),
+        )
+
+    monkeypatch.setattr(deps, "_load_user", load_admin)
+    app.dependency_overrides[deps.get_token_data] = lambda: TokenPayload(sub=1)
+    app.dependency_overrides[get_db] = lambda: session
+    client = TestClient(app)
+    try:
+        first = client.get("/api/admin/users", params={"search": " Bob ", "sort": "name:asc"})
+        assert first.status_code == 200 and session.queries == 2
+
+        # Другое написание тех же параметров — попадание в кэш без запросов в БД
+        cached = client.get("/api/admin/users", params={"search": "bob"})
+        assert cached.content == first.content and cached.headers["etag"] == first.headers["etag"]
+        assert session.queries == 2
+
+        # Любое изменение пользователей меняет метку списка: следующий запрос идёт в БД
+        asyncio.run(stamps.bump(USERS))
+        client.get("/api/admin/users", params={"search": "bob"})
+        assert session.queries == 4
+    finally:
+        app.dependency_overrides.clear()
+
+def test_inactive_user_gets_403_even_with_matching_etag(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr("app.api.endpoints.auth.versions", VersionStamps(redis))
+    user = _row()
+
+    async def load_user(user_id):
+        return user
+
+    monkeypatch.setattr(deps, "_load_user", load_user)
+    app.dependency_overrides[deps.get_token_payload] = lambda: TokenPayload(sub=7)
+    app.dependency_overrides[get_redis_batch] = lambda: RedisBatch(redis)
+    client = TestClient(app)
+    try:
+        etag = client.get("/api/auth/me").headers["etag"]
+        user.is_active = False
+        for header in ("*", etag):
+            response = client.get("/api/auth/me", headers={"If-None-Match": header})
+            assert response.status_code == 403
+    finally:
+        app.dependency_overrides.clear()
+
+def test_non_admin_gets_403_even_with_matching_etag(monkeypatch):
+    redis = FakeRedis()
+    session = FakeSession()
+    monkeypatch.setattr(admin, "versions", VersionStamps(redis))
+    monkeypatch.setattr(admin, "users_page_cache", ResultCache("admin_users", redis))
+    user = UserRow(
+        id=1, username="root", email="root@example.com", hashed_password="x", role_id=2,
+        is_active=True, role_obj=RoleRow(id=2, name="admin", description=None),
+    )
+
+    async def load_user(user_id):
+        return user
+
+    monkeypatch.setattr(deps, "_load_user", load_user)
+    app.dependency_overrides[deps.get_token_data] = lambda: TokenPayload(sub=1)
+    app.dependency_overrides[get_db] = lambda: session
+    client = TestClient(app)
+    try:
+        etag = client.get("/api/admin/users").headers["etag"]
+        # Роль снята, метка списка не менялась: ETag администратора по-прежнему актуален
+        user.role_obj = None
+        for header in ("*", etag):
+            response = client.get("/api/admin/users", headers={"If-None-Match": header})
+            assert response.status_code == 403
+    finally:
+        app.dependency_overrides.clear()